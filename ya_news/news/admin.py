@@ -1,15 +1,71 @@
+from django.conf import settings
 from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
 
 from .models import Comment, News
 
 
-class CommentInline(admin.StackedInline):
+class LatestCommentsFormSet(BaseInlineFormSet):
+    """Показывает только последние комментарии, а не всю ветку."""
+
+    def get_queryset(self):
+        if not hasattr(self, '_latest'):
+            self._latest = list(
+                super().get_queryset()[:settings.NEWS_ADMIN_INLINE_COMMENTS]
+            )
+        return self._latest
+
+
+class CommentInline(admin.TabularInline):
     model = Comment
+    formset = LatestCommentsFormSet
+    fields = ('author', 'text', 'created')
+    readonly_fields = fields
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).order_by('-created', '-id')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count', 'views')
+    readonly_fields = ('all_comments',)
+    search_fields = ('title',)
+    date_hierarchy = 'date'
+    show_full_result_count = False
     inlines = [
         CommentInline,
     ]
+
+    @admin.display(description='Комментарии')
+    def all_comments(self, obj):
+        url = reverse('admin:news_comment_changelist')
+        return format_html(
+            '<a href="{}?news__id__exact={}">Все комментарии ({})</a>',
+            url, obj.pk, obj.comment_count
+        )
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'news', 'author', 'created')
+    list_select_related = ('news', 'author')
+    raw_id_fields = ('news', 'author')
+    search_fields = ('text', '=author__username')
+    date_hierarchy = 'created'
+    list_per_page = 50
+    show_full_result_count = False
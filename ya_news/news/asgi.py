@@ -0,0 +1,64 @@
+"""
+ASGI-обработчик, который умеет отдавать потоковые ответы с ORM.
+
+Django 3.2 перебирает части StreamingHttpResponse прямо в цикле
+событий, и генератор, который читает базу, падает с
+SynchronousOnlyOperation. Здесь каждая часть готовится через
+sync_to_async в том же потоке, где выполнялось синхронное
+представление, а цикл событий только отправляет готовые байты.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+_END = object()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers(response),
+        })
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        try:
+            while True:
+                part = await next_part(parts, _END)
+                if part is _END:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def response_headers(response):
+    """Заголовки и cookie ответа в виде пар байтов для ASGI."""
+    headers = []
+    for header, value in response.items():
+        if isinstance(header, str):
+            header = header.encode('ascii')
+        if isinstance(value, str):
+            value = value.encode('latin1')
+        headers.append((bytes(header), bytes(value)))
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+        )
+    return headers
+
+
+def get_asgi_application():
+    """Аналог django.core.asgi.get_asgi_application с этим обработчиком."""
+    import django
+    django.setup(set_prefix=False)
+    return ASGIHandler()
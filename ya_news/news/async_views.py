@@ -0,0 +1,99 @@
+"""
+Асинхронные версии страниц новостей для запуска под ASGI.
+
+Работа с ORM и шаблонами синхронная, поэтому она выполняется
+в общем ограниченном пуле потоков, а независимые запросы к базе
+идут параллельно.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed
+from django.shortcuts import render
+
+from .conditional import add_validators, detail_validators, not_modified
+from .cache import NEWS_VERSION_KEY
+from .counters import view_counter
+from .forms import CommentForm
+from .page_cache import cache_page, get_cached_page
+from .views import (
+    NewsComment, NewsDetail, NewsList, comments_page, get_news
+)
+
+ORM_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.NEWS_ASYNC_ORM_WORKERS,
+    thread_name_prefix='news-orm',
+)
+
+
+def _in_pool(func):
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+async def run_orm(func, *args, **kwargs):
+    """Выполняет синхронный код в общем пуле потоков."""
+    return await sync_to_async(
+        _in_pool(func), thread_sensitive=False, executor=ORM_EXECUTOR
+    )(*args, **kwargs)
+
+
+def _call_view(view, request, **kwargs):
+    """Вызывает синхронное представление и сразу рендерит ответ."""
+    response = view(request, **kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    return response
+
+
+def _load_comments(request, news_id):
+    page = comments_page(request, news_id)
+    page.has_next()
+    return page
+
+
+def _render_detail(request, news, comments):
+    context = {'news': news, 'object': news, 'comments': comments}
+    if request.user.is_authenticated:
+        context['form'] = CommentForm()
+    return render(request, NewsDetail.template_name, context)
+
+
+async def news_list(request):
+    return await run_orm(_call_view, NewsList.as_view(), request)
+
+
+async def news_detail(request, pk):
+    """Новость и первая страница комментариев загружаются параллельно."""
+    await run_orm(view_counter.hit, pk)
+    version_keys = (NEWS_VERSION_KEY.format(pk),)
+    response = await run_orm(get_cached_page, request, version_keys)
+    if response is not None:
+        return response
+    validators = await run_orm(detail_validators, request, pk)
+    response = not_modified(request, validators)
+    if response is None:
+        news, comments = await asyncio.gather(
+            run_orm(get_news, pk),
+            run_orm(_load_comments, request, pk),
+        )
+        response = await run_orm(_render_detail, request, news, comments)
+    response = add_validators(response, validators)
+    return await run_orm(cache_page, request, version_keys, response)
+
+
+async def news_detail_view(request, pk):
+    if request.method in ('GET', 'HEAD'):
+        return await news_detail(request, pk)
+    if request.method == 'POST':
+        return await run_orm(
+            _call_view, NewsComment.as_view(), request, pk=pk
+        )
+    return HttpResponseNotAllowed(('GET', 'HEAD', 'POST'))
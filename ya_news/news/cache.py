@@ -0,0 +1,135 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+
+HOME_VERSION_KEY = 'news:home:version'
+# Меняется при записи просмотров: от них зависит порядок ?order=popular.
+VIEWS_VERSION_KEY = 'news:views:version'
+NEWS_VERSION_KEY = 'news:{}:version'
+NEWS_ITEM_FRAGMENT = 'news_item'
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_cache():
+    """Кэш новостей из настройки NEWS_CACHE_ALIAS."""
+    return caches[settings.NEWS_CACHE_ALIAS]
+
+
+def get_version(key):
+    """Текущая версия закэшированных данных."""
+    return get_cache().get_or_set(key, time.time_ns, timeout=None)
+
+
+def bump_version(key):
+    """Новая версия делает недоступными все ключи со старой."""
+    get_cache().set(key, time.time_ns(), timeout=None)
+
+
+def home_version_keys(request):
+    """Ключи версий, от которых зависит список новостей из запроса."""
+    if request.GET.get('order') == 'popular':
+        return (HOME_VERSION_KEY, VIEWS_VERSION_KEY)
+    return (HOME_VERSION_KEY,)
+
+
+def home_cache_key(request):
+    """Ключ отрендеренного списка новостей для страницы из запроса."""
+    return ':'.join((
+        'news:home',
+        *(str(get_version(key)) for key in home_version_keys(request)),
+        request.GET.get('order', ''),
+        request.GET.get('after', ''),
+        request.GET.get('before', ''),
+    ))
+
+
+def is_fresh(entry, beta=1.0):
+    """
+    Можно ли отдать запись без пересчёта.
+
+    Незадолго до срока запись случайно признаётся устаревшей тем
+    чаще, чем дольше её считать (XFetch), поэтому пересчёт обычно
+    начинается раньше, чем истечёт срок у всех сразу.
+    """
+    _, delta, expires = entry
+    early = delta * beta * -math.log(1.0 - random.random())
+    return time.time() + early < expires
+
+
+def single_flight(key, compute, timeout=None):
+    """
+    Значение из кэша; при промахе пересчитывает его один вызов.
+
+    Пересчитывает тот, кто первым захватил блокировку через
+    cache.add. Остальные получают устаревшее значение, а если его
+    нет, ждут не дольше NEWS_CACHE_LOCK_WAIT секунд и после этого
+    считают сами. Устаревшее значение хранится ещё
+    NEWS_CACHE_STALE_TIMEOUT секунд после срока.
+    """
+    cache = get_cache()
+    if timeout is None:
+        timeout = settings.NEWS_CACHE_TIMEOUT
+    lock_key = f'{key}:lock'
+    deadline = None
+    while True:
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry):
+            return entry[0]
+        if cache.add(lock_key, True, settings.NEWS_CACHE_LOCK_TIMEOUT):
+            try:
+                started = time.time()
+                value = compute()
+                finished = time.time()
+                cache.set(
+                    key,
+                    (value, finished - started, finished + timeout),
+                    timeout + settings.NEWS_CACHE_STALE_TIMEOUT,
+                )
+            finally:
+                cache.delete(lock_key)
+            return value
+        if entry is not None:
+            return entry[0]
+        if deadline is None:
+            deadline = time.monotonic() + settings.NEWS_CACHE_LOCK_WAIT
+        elif time.monotonic() >= deadline:
+            return compute()
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def cached_home(request, render):
+    return single_flight(home_cache_key(request), render)
+
+
+def news_cache_key(news_id, part):
+    """Ключ данных новости с её текущей версией."""
+    return ':'.join((
+        'news',
+        str(news_id),
+        str(get_version(NEWS_VERSION_KEY.format(news_id))),
+        part,
+    ))
+
+
+def cached_news(news_id, part, compute):
+    """
+    Данные новости из кэша или из compute() при промахе.
+
+    Версия читается до обращения к базе. Если новость изменится
+    во время расчёта, результат ляжет под старым ключом, который
+    уже никто не прочитает.
+    """
+    return single_flight(news_cache_key(news_id, part), compute)
+
+
+def invalidate_news(news_id):
+    """Сбрасывает фрагмент и данные новости и все страницы списка."""
+    get_cache().delete(
+        make_template_fragment_key(NEWS_ITEM_FRAGMENT, (news_id,))
+    )
+    bump_version(NEWS_VERSION_KEY.format(news_id))
+    bump_version(HOME_VERSION_KEY)
@@ -0,0 +1,104 @@
+import hashlib
+from calendar import timegm
+from datetime import datetime, time
+
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response, patch_vary_headers, quote_etag
+)
+from django.utils.http import http_date
+
+from .cache import NEWS_VERSION_KEY, get_version, home_version_keys
+from .models import News
+
+
+def make_etag(request, *parts):
+    """
+    Тег версии с учётом пользователя: у него свой заголовок и форма.
+
+    Для авторизованных в тег входят ключ сессии и CSRF-токен:
+    после нового входа форма со старым токеном не пройдёт проверку,
+    поэтому закэшированную копию страницы использовать нельзя.
+    """
+    user = ('anon',)
+    if request.user.is_authenticated:
+        user = (
+            request.user.pk,
+            request.session.session_key,
+            request.META.get('CSRF_COOKIE', ''),
+        )
+    raw = ':'.join(str(part) for part in (*user, *parts))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def home_validators(request):
+    versions = [get_version(key) for key in home_version_keys(request)]
+    etag = make_etag(request, *versions, request.GET.urlencode())
+    return etag, None
+
+
+def detail_validators(request, news_id):
+    """
+    Валидаторы страницы новости.
+
+    Дата новости и время последнего комментария берутся одним
+    агрегирующим запросом, версия из кэша учитывает правки.
+    Для авторизованных Last-Modified не отдаётся: страница
+    зависит от пользователя, и сверять её можно только по ETag.
+    """
+    row = News.objects.filter(pk=news_id).annotate(
+        last_comment=Max('comment__created')
+    ).values_list('date', 'comment_count', 'last_comment').first()
+    if row is None:
+        return None, None
+    date, comment_count, last_comment = row
+    version = get_version(NEWS_VERSION_KEY.format(news_id))
+    etag = make_etag(
+        request, date, comment_count, last_comment, version,
+        request.GET.urlencode()
+    )
+    if request.user.is_authenticated:
+        return etag, None
+    modified = [
+        timegm(timezone.make_aware(datetime.combine(date, time.min))
+               .utctimetuple()),
+        version // 10 ** 9,
+    ]
+    if last_comment is not None:
+        modified.append(timegm(last_comment.utctimetuple()))
+    return etag, max(modified)
+
+
+def not_modified(request, validators):
+    """Ответ 304 (или 412), если у клиента актуальная копия, иначе None."""
+    etag, last_modified = validators
+    if etag is None:
+        return None
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def add_validators(response, validators):
+    etag, last_modified = validators
+    if etag is not None and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault(
+                'Last-Modified', http_date(last_modified)
+            )
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def conditional_get(request, validators, render):
+    """
+    Отвечает 304 без рендеринга, если у клиента актуальная копия.
+
+    render вызывается, только если страницу нужно отдать целиком.
+    """
+    response = not_modified(request, validators)
+    if response is None:
+        response = render()
+    return add_validators(response, validators)
@@ -0,0 +1,154 @@
+"""
+Рассылка новых комментариев подписчикам потока событий новости.
+
+Брокер живёт в процессе и раздаёт события очередям подписчиков.
+Бэкенд определяет, как события попадают к брокерам: напрямую
+внутри процесса или через таблицу в базе, которую опрашивает
+каждый процесс.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .async_views import run_orm
+from .models import CommentEvent
+
+
+class Subscription:
+    """
+    Очередь событий одного подписчика.
+
+    Очередь ограничена: если клиент не успевает читать, старые
+    события вытесняются новыми, и память на соединение не растёт.
+    """
+
+    def __init__(self, broker, news_id, maxsize):
+        self.broker = broker
+        self.news_id = news_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(data)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, news_id):
+        subscription = Subscription(
+            self, news_id, settings.NEWS_EVENTS_QUEUE_SIZE
+        )
+        with self._lock:
+            self._subscriptions[news_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.news_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.news_id]
+
+    def dispatch(self, news_id, data):
+        """Передаёт событие подписчикам; можно вызывать из любого потока."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(news_id, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.push, data)
+
+
+broker = Broker()
+
+
+class LocalBackend:
+    """События доходят только до подписчиков этого процесса."""
+
+    def publish(self, news_id, data):
+        broker.dispatch(news_id, data)
+
+    async def listen(self):
+        pass
+
+
+class SQLitePollingBackend:
+    """
+    События записываются в таблицу и читаются всеми процессами.
+
+    Каждый процесс опрашивает таблицу раз в
+    NEWS_EVENTS_POLL_INTERVAL секунд; события старше
+    NEWS_EVENTS_RETENTION секунд удаляются при записи новых.
+    """
+
+    def __init__(self):
+        self._poller = None
+
+    def publish(self, news_id, data):
+        CommentEvent.objects.filter(created__lt=timezone.now() - timedelta(
+            seconds=settings.NEWS_EVENTS_RETENTION
+        )).delete()
+        CommentEvent.objects.create(news_id=news_id, data=json.dumps(data))
+
+    async def listen(self):
+        if (
+            self._poller is None
+            or self._poller.done()
+            or self._poller.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._poller = asyncio.ensure_future(self._poll())
+
+    async def _poll(self):
+        last_id = await run_orm(self._last_id)
+        while True:
+            await asyncio.sleep(settings.NEWS_EVENTS_POLL_INTERVAL)
+            events = await run_orm(self._fetch, last_id)
+            for event_id, news_id, data in events:
+                broker.dispatch(news_id, json.loads(data))
+                last_id = event_id
+
+    @staticmethod
+    def _last_id():
+        return CommentEvent.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    @staticmethod
+    def _fetch(last_id):
+        return list(CommentEvent.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', 'news_id', 'data'))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.NEWS_EVENTS_BACKEND)()
+
+
+def comment_event(comment):
+    return {
+        'id': comment.pk,
+        'author': str(comment.author),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
@@ -0,0 +1,49 @@
+import json
+import zlib
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Comment, News
+
+NEWS_FIELDS = ('id', 'title', 'text', 'date', 'comment_count')
+COMMENT_FIELDS = ('id', 'news_id', 'author_id', 'text', 'created')
+
+
+def export_lines(since=None, chunk_size=2000):
+    """
+    Новости и комментарии построчно в формате JSON Lines.
+
+    Строки читаются из базы порциями через iterator(), поэтому
+    память не зависит от количества записей.
+    """
+    news = News.objects.order_by('pk')
+    # Порядок по индексу created: выгрузка с даты since читает
+    # только нужный диапазон и не сортирует его.
+    comments = Comment.objects.order_by('created', 'pk')
+    if since is not None:
+        news = news.filter(date__gte=since)
+        comments = comments.filter(created__gte=timezone.make_aware(
+            datetime.combine(since, time.min)
+        ))
+    for model, queryset, fields in (
+        ('news', news, NEWS_FIELDS),
+        ('comment', comments, COMMENT_FIELDS),
+    ):
+        for row in queryset.values(*fields).iterator(chunk_size=chunk_size):
+            yield json.dumps(
+                {'model': model, **row},
+                cls=DjangoJSONEncoder,
+                ensure_ascii=False,
+            ).encode() + b'\n'
+
+
+def gzip_stream(chunks):
+    """Сжимает поток байтов в gzip на лету."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
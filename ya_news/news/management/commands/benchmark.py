@@ -0,0 +1,289 @@
+import asyncio
+import importlib
+import io
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, reverse
+
+from news import urls as news_urls
+from news.asgi import ASGIHandler
+from news.forms import BAD_WORDS
+from news.models import News
+from news.profanity import WordMatcher
+from news.search import rebuild_index, search_news
+
+SCENARIOS = ('matcher', 'home', 'search', 'async')
+# Замеры, которые видят данные из других потоков и поэтому
+# не могут выполняться в откатываемой транзакции.
+COMMITTED_SCENARIOS = ('async',)
+WORDS = (
+    'новость', 'город', 'погода', 'спорт', 'выборы', 'театр', 'музей',
+    'парк', 'школа', 'мост', 'дорога', 'концерт', 'выставка', 'рынок',
+)
+RARE_WORD = 'дирижабль'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет горячие пути новостей на временных данных: поиск '
+        'запрещённых слов, главную для анонимов и полнотекстовый поиск. '
+        'Данные создаются в транзакции, которая затем откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help=f'Что замерять: {", ".join(SCENARIOS)}; по умолчанию всё.'
+        )
+        parser.add_argument('--news', type=int, default=5000)
+        parser.add_argument('--words', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[50, 200, 1000],
+            help='Числа одновременных соединений для замера async.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Запросов на каждый замер async.'
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.random = random.Random(options['seed'])
+        unknown = set(options['scenarios']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Неизвестные замеры: {", ".join(unknown)}')
+        for scenario in options['scenarios'] or SCENARIOS:
+            bench = getattr(self, f'bench_{scenario}')
+            if scenario in COMMITTED_SCENARIOS:
+                bench(options)
+                continue
+            with transaction.atomic():
+                bench(options)
+                transaction.set_rollback(True)
+
+    def measure(self, func):
+        """Медиана времени вызова func в миллисекундах."""
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def report(self, scenario, **timings):
+        results = ', '.join(
+            f'{name} {value:.3f} ms' for name, value in timings.items()
+        )
+        self.stdout.write(f'{scenario}: {results}')
+
+    def sentence(self, length):
+        return ' '.join(self.random.choice(WORDS) for _ in range(length))
+
+    def bench_matcher(self, options):
+        """Автомат против проверки каждого слова по очереди."""
+        words = [*BAD_WORDS, *(
+            f'{self.random.choice(WORDS)}{index}'
+            for index in range(options['words'])
+        )]
+        matcher = WordMatcher(words)
+        text = self.sentence(300)
+
+        def naive():
+            lowered = text.lower()
+            return any(word in lowered for word in words)
+
+        self.report(
+            'matcher',
+            aho_corasick=self.measure(lambda: matcher.search(text)),
+            naive=self.measure(naive),
+        )
+
+    def create_news(self, count):
+        """Новости из частых слов, в каждой сотой есть редкое слово."""
+        News.objects.bulk_create(
+            News(
+                title=self.sentence(5),
+                text=self.sentence(80) + (
+                    f' {RARE_WORD}' if index % 100 == 0 else ''
+                ),
+            )
+            for index in range(count)
+        )
+        rebuild_index()
+
+    def bench_home(self, options):
+        """Главная для анонимов: без кэша, с кэшем списка и страницы."""
+        self.create_news(options['news'])
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        url = reverse('news:home')
+        cache = caches[settings.NEWS_CACHE_ALIAS]
+
+        def cold():
+            cache.clear()
+            client.get(url)
+
+        with override_settings(NEWS_PAGE_CACHE=False):
+            uncached = self.measure(cold)
+            client.get(url)
+            list_cached = self.measure(lambda: client.get(url))
+        client.get(url)
+        page_cached = self.measure(lambda: client.get(url))
+        cache.clear()
+        self.report(
+            'home', uncached=uncached, list_cache=list_cached,
+            page_cache=page_cached,
+        )
+
+    def bench_search(self, options):
+        """
+        Индекс FTS5 против LIKE по заголовку и тексту.
+
+        Частое слово LIKE находит в первых же строках, а FTS5
+        ранжирует все совпадения; редкое слово LIKE ищет по всей
+        таблице.
+        """
+        self.create_news(options['news'])
+        limit = settings.NEWS_SEARCH_RESULTS
+
+        def like(query):
+            return list(News.objects.filter(
+                Q(title__icontains=query) | Q(text__icontains=query)
+            )[:limit])
+
+        for name, query in (('rare', RARE_WORD), ('common', WORDS[0])):
+            self.report(
+                f'search {name}',
+                fts5=self.measure(lambda: search_news(query, limit)),
+                like=self.measure(lambda: like(query)),
+            )
+
+    def bench_async(self, options):
+        """
+        Пропускная способность WSGI и ASGI при разном числе соединений.
+
+        WSGI обслуживает соединения пулом потоков, как многопоточный
+        сервер, и вызывает синхронные страницы. ASGI выполняет все
+        запросы в одном цикле событий с асинхронными страницами из
+        async_views. Запросы делятся между главной и страницами
+        новостей. Кэш целых страниц выключен, чтобы замерялись
+        сами страницы. Новости для замера сохраняются в базе
+        и удаляются после него.
+        """
+        first = News.objects.order_by('-pk').values_list('pk', flat=True)
+        first = (first.first() or 0) + 1
+        self.create_news(options['news'])
+        paths = ['/'] + [
+            f'/news/{pk}/' for pk in News.objects.filter(
+                pk__gte=first
+            ).values_list('pk', flat=True)[:50]
+        ]
+        total = options['requests']
+        requests = [self.random.choice(paths) for _ in range(total)]
+        try:
+            with override_settings(NEWS_PAGE_CACHE=False):
+                for concurrency in options['concurrency']:
+                    with news_views(use_async=False):
+                        wsgi = self.run_wsgi(requests, concurrency)
+                    with news_views(use_async=True):
+                        asgi = asyncio.run(
+                            self.run_asgi(requests, concurrency)
+                        )
+                    self.stdout.write(
+                        f'async {concurrency}: wsgi {wsgi:.0f} req/s, '
+                        f'asgi {asgi:.0f} req/s'
+                    )
+        finally:
+            News.objects.filter(pk__gte=first).delete()
+            caches[settings.NEWS_CACHE_ALIAS].clear()
+
+    @staticmethod
+    def run_wsgi(requests, concurrency):
+        """Запросов в секунду у WSGI с пулом из concurrency потоков."""
+        handler = WSGIHandler()
+        host = settings.ALLOWED_HOSTS[0]
+
+        def get(path):
+            statuses = []
+            body = handler({
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': '',
+                'SERVER_NAME': host,
+                'SERVER_PORT': '80',
+                'HTTP_HOST': host,
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http',
+            }, lambda status, headers: statuses.append(status))
+            b''.join(body)
+            body.close()
+            if not statuses[0].startswith('200'):
+                raise CommandError(f'{path}: {statuses[0]}')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(get, requests))
+        return len(requests) / (time.perf_counter() - started)
+
+    @staticmethod
+    async def run_asgi(requests, concurrency):
+        """Запросов в секунду у ASGI при concurrency соединениях."""
+        handler = ASGIHandler()
+        host = settings.ALLOWED_HOSTS[0].encode()
+        queue = iter(requests)
+
+        async def connection():
+            for path in queue:
+                messages = []
+
+                async def receive():
+                    return {'type': 'http.request', 'body': b''}
+
+                async def send(message):
+                    messages.append(message)
+
+                await handler({
+                    'type': 'http', 'method': 'GET', 'path': path,
+                    'query_string': b'', 'headers': [(b'host', host)],
+                }, receive, send)
+                if messages[0]['status'] != 200:
+                    raise CommandError(f'{path}: {messages[0]["status"]}')
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(concurrency)))
+        return len(requests) / (time.perf_counter() - started)
+
+
+@contextmanager
+def news_views(use_async):
+    """
+    Подключает синхронные или асинхронные страницы новостей.
+
+    Страницы выбираются в news.urls по настройке NEWS_ASYNC_VIEWS
+    при импорте, поэтому модули адресов перезагружаются.
+    """
+    def reload():
+        importlib.reload(news_urls)
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(NEWS_ASYNC_VIEWS=use_async):
+            reload()
+            yield
+    finally:
+        reload()
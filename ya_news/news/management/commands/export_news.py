@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.export import export_lines, gzip_stream
+
+
+class Command(BaseCommand):
+    help = 'Выгружает новости и комментарии в формате JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=date.fromisoformat,
+            help='Только записи с этой даты (ГГГГ-ММ-ДД).'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжать выгрузку gzip; нужен --output.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['gzip'] and not options['output']:
+            raise CommandError('Сжатая выгрузка пишется только в --output.')
+        chunks = export_lines(options['since'], options['chunk_size'])
+        if options['gzip']:
+            chunks = gzip_stream(chunks)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+            return
+        # Каждая порция — целые строки, поэтому её можно декодировать
+        # отдельно и писать в self.stdout, который подменяет call_command.
+        for chunk in chunks:
+            self.stdout.write(chunk.decode(), ending='')
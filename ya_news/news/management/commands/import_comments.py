@@ -0,0 +1,151 @@
+import csv
+import json
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from news.cache import invalidate_news
+from news.models import Comment, DiscussionRank, News
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает комментарии из CSV или JSON Lines порциями. '
+        'Поля записи: news_id, author (имя пользователя), text, '
+        'created (необязательно, ISO 8601).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format', choices=('csv', 'jsonl'),
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint', type=Path,
+            help=(
+                'Файл с числом уже обработанных записей. Если он есть, '
+                'загрузка продолжится с места остановки.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.')
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        checkpoint = options['checkpoint'] and Path(options['checkpoint'])
+        done = 0
+        if checkpoint and checkpoint.exists():
+            done = int(checkpoint.read_text() or 0)
+        imported = skipped = malformed = 0
+        with path.open(encoding='utf-8', newline='') as source:
+            rows = self.read_rows(source, file_format)
+            rows = islice(rows, done, None)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                valid = [
+                    row for row in map(self.clean_row, chunk)
+                    if row is not None
+                ]
+                created = self.import_chunk(valid)
+                imported += created
+                malformed += len(chunk) - len(valid)
+                skipped += len(chunk) - created
+                done += len(chunk)
+                if checkpoint:
+                    checkpoint.write_text(str(done))
+                self.stdout.write(f'Обработано записей: {done}')
+        self.stdout.write(
+            f'Загружено комментариев: {imported}, пропущено: {skipped}, '
+            f'из них с ошибками: {malformed}'
+        )
+
+    @staticmethod
+    def read_rows(source, file_format):
+        """Записи файла; строка JSON Lines с ошибкой даёт None."""
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+    def clean_row(self, row):
+        """
+        Кортеж (news_id, author, text, created) или None.
+
+        Запись с ошибкой в полях пропускается так же, как запись
+        с неизвестным автором или новостью.
+        """
+        if not isinstance(row, dict):
+            return None
+        author, text = row.get('author'), row.get('text')
+        if not isinstance(author, str) or not isinstance(text, str):
+            return None
+        try:
+            news_id = int(row.get('news_id'))
+            created = self.parse_created(row.get('created'))
+        except (TypeError, ValueError):
+            return None
+        return news_id, author, text, created
+
+    def import_chunk(self, chunk):
+        """
+        Загружает порцию в одной транзакции.
+
+        Авторы и новости ищутся одним запросом на порцию, записи
+        с неизвестным автором или новостью пропускаются.
+        """
+        authors = dict(User.objects.filter(
+            username__in={author for _, author, _, _ in chunk}
+        ).values_list('username', 'id'))
+        news_ids = set(News.objects.filter(
+            pk__in={news_id for news_id, _, _, _ in chunk}
+        ).values_list('pk', flat=True))
+        comments = []
+        for news_id, author, text, created in chunk:
+            author_id = authors.get(author)
+            if author_id is None or news_id not in news_ids:
+                continue
+            comments.append(Comment(
+                news_id=news_id,
+                author_id=author_id,
+                text=text,
+                created=created,
+            ))
+        counts = Counter(comment.news_id for comment in comments)
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+            News.objects.increment('comment_count', counts)
+            # bulk_create не отправляет сигналы, рейтинг обсуждаемых
+            # новостей пересчитывается для новостей порции.
+            DiscussionRank.objects.rebuild(counts)
+        for news_id in counts:
+            invalidate_news(news_id)
+        return len(comments)
+
+    @staticmethod
+    def parse_created(value):
+        if not value:
+            return timezone.now()
+        created = parse_datetime(value)
+        if created is None:
+            raise ValueError(f'Некорректная дата: {value}')
+        if timezone.is_naive(created):
+            created = timezone.make_aware(created)
+        return created
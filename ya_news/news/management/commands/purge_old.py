@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from news.cache import invalidate_news
+from news.models import Comment, DiscussionRank, News
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет комментарии или новости старше заданного числа дней. '
+        'Записи удаляются небольшими порциями по диапазонам id, каждая '
+        'порция в своей короткой транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=('comments', 'news'))
+        parser.add_argument('--days', type=int, required=True)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep', type=float, default=0.1,
+            help='Пауза между порциями в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.pause = options['sleep']
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['model'] == 'comments':
+            deleted = self.purge(Comment.objects.filter(created__lt=cutoff))
+            self.stdout.write(f'Удалено комментариев: {deleted}')
+        else:
+            deleted = self.purge_news(
+                News.objects.filter(date__lt=cutoff.date())
+            )
+            self.stdout.write(f'Удалено новостей: {deleted}')
+
+    def batches(self, queryset):
+        """Границы id для порций записей из queryset."""
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(pk__gt=last_id).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:self.batch_size])
+            if not ids:
+                return
+            yield last_id, ids[-1]
+            last_id = ids[-1]
+
+    def purge(self, comments):
+        """
+        Удаляет комментарии и пересчитывает счётчики их новостей.
+
+        Порция удаляется одним DELETE без загрузки записей и без
+        сигналов post_delete, а счётчики, рейтинг и кэш обновляются
+        один раз для каждой затронутой новости.
+        """
+        total = 0
+        for first, last in self.batches(comments):
+            with transaction.atomic():
+                batch = comments.filter(pk__gt=first, pk__lte=last)
+                news_ids = set(batch.values_list('news_id', flat=True))
+                deleted = batch._raw_delete(batch.db)
+                News.objects.filter(pk__in=news_ids).recount_comments()
+                DiscussionRank.objects.rebuild(news_ids)
+            for news_id in news_ids:
+                invalidate_news(news_id)
+            total += deleted
+            self.stdout.write(f'Удалено комментариев: {total}...')
+            time.sleep(self.pause)
+        return total
+
+    def purge_news(self, news):
+        """
+        Удаляет новости вместе с комментариями.
+
+        Комментарии удаляются заранее теми же порциями, чтобы при
+        удалении новости Django не загружал их все в память.
+        """
+        total = 0
+        for first, last in self.batches(news):
+            batch = news.filter(pk__gt=first, pk__lte=last)
+            self.purge(Comment.objects.filter(news__in=batch))
+            with transaction.atomic():
+                _, deleted = batch.filter(comment__isnull=True).delete()
+            total += deleted.get(News._meta.label, 0)
+            self.stdout.write(f'Удалено новостей: {total}...')
+            time.sleep(self.pause)
+        return total
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import DiscussionRank
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг обсуждаемых новостей. Запускайте '
+        'периодически, чтобы старые комментарии выпадали из периодов.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            DiscussionRank.objects.rebuild()
+        self.stdout.write('Рейтинг пересчитан.')
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_comment_news_created_id_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE news_search USING fts5("
+                "title, text, tokenize='unicode61 remove_diacritics 2')",
+                'INSERT INTO news_search (rowid, title, text) '
+                'SELECT id, title, text FROM news_news',
+            ],
+            reverse_sql=['DROP TABLE news_search'],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 01:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_comment_created_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.TextField()),
+                ('created', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.news')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-18 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_commentevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-views', '-id'], name='news_views_id_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 01:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscussionRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Сутки'), ('week', 'Неделя'), ('month', 'Месяц')], max_length=5)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.news')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='discussionrank',
+            index=models.Index(fields=['period', '-score', 'news'], name='discussion_rank_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='discussionrank',
+            constraint=models.UniqueConstraint(fields=('period', 'news'), name='discussion_rank_unique'),
+        ),
+    ]
@@ -1,16 +1,54 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def recount_comments(self):
+        """Пересчитывает счётчик комментариев одним UPDATE."""
+        counts = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.update(comment_count=Coalesce(Subquery(counts), 0))
+
+    def increment(self, field, amounts):
+        """
+        Прибавляет к полю свои значения для каждой новости.
+
+        amounts — словарь {id новости: прибавка}, всё обновляется
+        одним UPDATE ... CASE.
+        """
+        if not amounts:
+            return 0
+        return self.filter(pk__in=amounts).update(**{field: F(field) + Case(
+            *(When(pk=pk, then=Value(amount))
+              for pk, amount in amounts.items()),
+            default=Value(0),
+        )})
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    views = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('-date', '-id'), name='news_date_id_idx'),
+            models.Index(fields=('-views', '-id'), name='news_views_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
@@ -28,10 +66,125 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(
+        default=timezone.now, editable=False, db_index=True
+    )
 
     class Meta:
-        ordering = ('created',)
+        ordering = ('created', 'id')
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        """
+        Новый комментарий и счётчик его новости меняются вместе.
+
+        Счётчик обновляется в post_save, поэтому сохранение нового
+        комментария выполняется в транзакции.
+        """
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class CommentEvent(models.Model):
+    """Событие о новом комментарии для бэкенда с опросом таблицы."""
+    news = models.ForeignKey(News, on_delete=models.CASCADE)
+    data = models.TextField()
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+class DiscussionRankQuerySet(models.QuerySet):
+
+    def record(self, news_id, created, delta):
+        """
+        Учитывает добавленный (delta=1) или удалённый (delta=-1) комментарий.
+
+        Меняются только периоды, в которые попадает время комментария.
+        """
+        now = timezone.now()
+        periods = [
+            period for period, span in DiscussionRank.SPANS.items()
+            if created > now - span
+        ]
+        if not periods:
+            return
+        if delta > 0:
+            self.bulk_create(
+                (DiscussionRank(period=period, news_id=news_id)
+                 for period in periods),
+                ignore_conflicts=True,
+            )
+        self.filter(
+            news_id=news_id, period__in=periods, score__gte=-delta
+        ).update(score=F('score') + delta)
+
+    def rebuild(self, news_ids=None):
+        """
+        Пересчитывает рейтинг по комментариям за каждый период.
+
+        Комментарии, вышедшие за границу периода, перестают
+        учитываться только здесь, поэтому пересчёт нужно запускать
+        периодически. news_ids ограничивает пересчёт этими новостями.
+        """
+        now = timezone.now()
+        comments = Comment.objects.all()
+        ranks = self.all()
+        if news_ids is not None:
+            comments = comments.filter(news_id__in=news_ids)
+            ranks = ranks.filter(news_id__in=news_ids)
+        for period, span in DiscussionRank.SPANS.items():
+            counts = comments.filter(
+                created__gt=now - span
+            ).order_by().values('news').annotate(total=Count('pk'))
+            ranks.filter(period=period).delete()
+            self.bulk_create(
+                DiscussionRank(
+                    period=period, news_id=row['news'], score=row['total']
+                )
+                for row in counts.iterator()
+            )
+
+
+class DiscussionRank(models.Model):
+    """Число комментариев к новости за последние сутки, неделю или месяц."""
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIODS = (
+        (DAY, 'Сутки'),
+        (WEEK, 'Неделя'),
+        (MONTH, 'Месяц'),
+    )
+    SPANS = {
+        DAY: timedelta(days=1),
+        WEEK: timedelta(days=7),
+        MONTH: timedelta(days=30),
+    }
+
+    period = models.CharField(max_length=5, choices=PERIODS)
+    news = models.ForeignKey(News, on_delete=models.CASCADE)
+    score = models.PositiveIntegerField(default=0)
+
+    objects = DiscussionRankQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('period', 'news'), name='discussion_rank_unique'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('period', '-score', 'news'),
+                name='discussion_rank_top_idx',
+            ),
+        )
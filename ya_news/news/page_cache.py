@@ -0,0 +1,86 @@
+"""
+Кэш целых страниц для анонимных читателей.
+
+Запрос без cookie сессии точно анонимный, поэтому его можно
+обслужить из кэша, не загружая ни сессию, ни пользователя.
+Ключ включает версии данных страницы, и любое изменение новостей
+или комментариев делает старые копии недоступными.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from .cache import get_cache, get_version
+from .conditional import not_modified
+
+
+def is_cacheable_request(request):
+    """GET или HEAD без сессии при включённой настройке NEWS_PAGE_CACHE."""
+    return (
+        settings.NEWS_PAGE_CACHE
+        and request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def page_cache_key(request, version_keys):
+    versions = ':'.join(str(get_version(key)) for key in version_keys)
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'news:page:{versions}:{path}'
+
+
+def get_cached_page(request, version_keys):
+    """Копия страницы из кэша, ответ 304 или None при промахе."""
+    if not is_cacheable_request(request):
+        return None
+    response = get_cache().get(page_cache_key(request, version_keys))
+    if response is None:
+        return None
+    validators = (
+        response.get('ETag'),
+        parse_http_date_safe(response.get('Last-Modified', '')),
+    )
+    return not_modified(request, validators) or response
+
+
+def cache_page(request, version_keys, response):
+    """
+    Сохраняет ответ для следующих анонимных запросов.
+
+    Ответы, которые ставят cookie или выдали CSRF-токен, не
+    кэшируются: они предназначены одному клиенту.
+    """
+    if not is_cacheable_request(request) or response.streaming:
+        return response
+    key = page_cache_key(request, version_keys)
+    session = getattr(request, 'session', None)
+
+    def store(response):
+        if (
+            response.status_code != 200
+            or response.cookies
+            or request.META.get('CSRF_COOKIE_USED')
+            or session is not None and session.modified
+        ):
+            return
+        patch_cache_control(
+            response, public=True, max_age=settings.NEWS_PAGE_CACHE_MAX_AGE
+        )
+        patch_vary_headers(response, ('Cookie',))
+        get_cache().set(key, response, settings.NEWS_CACHE_TIMEOUT)
+
+    if callable(getattr(response, 'render', None)):
+        response.add_post_render_callback(store)
+    else:
+        store(response)
+    return response
+
+
+def anonymous_page(request, version_keys, view):
+    """Страница из кэша для анонимных читателей или ответ view()."""
+    response = get_cached_page(request, version_keys)
+    if response is None:
+        response = cache_page(request, version_keys, view())
+    return response
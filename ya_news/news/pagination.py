@@ -0,0 +1,159 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+INVALID_CURSOR = 'Некорректный курсор страницы.'
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу сортировки вместо OFFSET.
+
+    Страница начинается сразу после (или перед) записью из курсора,
+    поэтому глубокие страницы стоят столько же, сколько первая,
+    если порядок сортировки поддержан индексом.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        opts = queryset.model._meta
+        self.fields = [opts.get_field(key.lstrip('-')) for key in ordering]
+
+    def page(self, after=None, before=None):
+        """Страница после курсора after или перед курсором before."""
+        return KeysetPage(
+            self,
+            after=self.decode_cursor(after) if after else None,
+            before=self.decode_cursor(before) if before else None,
+        )
+
+    def encode_cursor(self, obj):
+        values = [
+            self._serialize(getattr(obj, field.attname))
+            for field in self.fields
+        ]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if (
+                not isinstance(values, list)
+                or len(values) != len(self.fields)
+            ):
+                raise ValueError(cursor)
+            return [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError, binascii.Error):
+            raise Http404(INVALID_CURSOR)
+
+    def seek(self, values, backwards=False):
+        """Условие «строго после values» в порядке сортировки."""
+        condition = None
+        for key, field, value in reversed(
+            list(zip(self.ordering, self.fields, values))
+        ):
+            descending = key.startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            beyond = Q(**{f'{field.attname}__{lookup}': value})
+            if condition is None:
+                condition = beyond
+            else:
+                condition = beyond | (
+                    Q(**{field.attname: value}) & condition
+                )
+        return condition
+
+    @staticmethod
+    def _serialize(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+class KeysetPage(Sequence):
+    """
+    Страница записей.
+
+    Запрос выполняется при первом обращении к записям страницы.
+    """
+
+    def __init__(self, paginator, after=None, before=None):
+        self.paginator = paginator
+        self.after = after
+        self.before = before
+
+    @cached_property
+    def queryset(self):
+        paginator = self.paginator
+        queryset = paginator.queryset
+        ordering = paginator.ordering
+        if self.before is not None:
+            queryset = queryset.filter(
+                paginator.seek(self.before, backwards=True)
+            )
+            ordering = [
+                key[1:] if key.startswith('-') else f'-{key}'
+                for key in ordering
+            ]
+        elif self.after is not None:
+            queryset = queryset.filter(paginator.seek(self.after))
+        return queryset.order_by(*ordering)[:paginator.per_page + 1]
+
+    @cached_property
+    def window(self):
+        """
+        Записи страницы и признаки следующей и предыдущей страниц.
+
+        Значение можно подставить заранее, например из кэша.
+        """
+        rows = list(self.queryset)
+        has_more = len(rows) > self.paginator.per_page
+        rows = rows[:self.paginator.per_page]
+        if self.before is not None:
+            return rows[::-1], True, has_more
+        return rows, has_more, self.after is not None
+
+    @property
+    def object_list(self):
+        return self.window[0]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} items>'
+
+    def has_next(self):
+        return self.window[1]
+
+    def has_previous(self):
+        return self.window[2]
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
@@ -0,0 +1,111 @@
+import logging
+import os
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WordMatcher:
+    """
+    Автомат Ахо — Корасик для поиска сразу всех слов из списка.
+
+    Текст просматривается за один проход, и время поиска не зависит
+    от количества слов в списке.
+    """
+
+    def __init__(self, words, source=None):
+        self.source = source
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for word in words:
+            self._add(word.lower())
+        self._link()
+
+    def _add(self, word):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = following
+        self._out[state] += (len(word),)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[following] = self._goto[fail].get(char, 0)
+                self._out[following] += self._out[self._fail[following]]
+
+    def find(self, text):
+        """Все вхождения слов в тексте в виде пар (начало, конец)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text.lower(), start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in out[state]:
+                yield end - length, end
+
+    def search(self, text):
+        """Первое найденное вхождение или None."""
+        return next(self.find(text), None)
+
+
+_matcher = None
+
+
+def _words_file():
+    path = getattr(settings, 'NEWS_BAD_WORDS_FILE', None)
+    if not path:
+        return None, None
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+
+
+def read_words(path):
+    """Слова из файла: по одному в строке, # начинает комментарий."""
+    with open(path, encoding='utf-8') as words_file:
+        words = (line.split('#', 1)[0].strip() for line in words_file)
+        return [word for word in words if word]
+
+
+def get_matcher(words):
+    """
+    Автомат для слов и файла из настройки NEWS_BAD_WORDS_FILE.
+
+    Автомат строится один раз и перестраивается, только если
+    изменился список слов или файл. Если файл не читается,
+    остаётся последний удачно загруженный список.
+    """
+    global _matcher
+    path, mtime = _words_file()
+    source = (tuple(words), path, mtime)
+    if _matcher is not None and _matcher.source == source:
+        return _matcher
+    try:
+        extra = read_words(path) if path else []
+    except OSError:
+        logger.warning('Не удалось прочитать файл слов %s', path)
+        if _matcher is not None and _matcher.source[:2] == source[:2]:
+            return _matcher
+        extra = []
+    _matcher = WordMatcher((*words, *extra), source=source)
+    return _matcher
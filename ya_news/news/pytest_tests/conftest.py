@@ -1,14 +1,32 @@
 from datetime import datetime, timedelta
 
 import pytest
+from django.core.cache import caches
 from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
 from django.test import Client
 
+from news import async_views, views
+from news.counters import ViewCounter
 from news.models import News, Comment
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+@pytest.fixture(autouse=True)
+def view_counter(monkeypatch):
+    """Свой счётчик просмотров, чтобы они не переходили в другие тесты."""
+    counter = ViewCounter()
+    monkeypatch.setattr(views, 'view_counter', counter)
+    monkeypatch.setattr(async_views, 'view_counter', counter)
+    return counter
+
+
 @pytest.fixture
 def news():
     return News.objects.create(
@@ -1,8 +1,20 @@
+import asyncio
+from datetime import datetime
+from http import HTTPStatus
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.test import Client
 from django.urls import reverse
 from django.conf import settings
 
+from news import async_views
+from news.asgi import ASGIHandler
+from news.cache import get_cache, invalidate_news, news_cache_key
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.pagination import KeysetPaginator
 
 
 @pytest.mark.django_db
@@ -50,3 +62,488 @@ def test_authorized_client_has_form(author_client, detail_url):
     assert 'form' in response.context
     form = response.context['form']
     assert isinstance(form, CommentForm)
+
+
+@pytest.mark.django_db
+def test_home_page_makes_single_query(
+    all_news, comment, client, django_assert_num_queries
+):
+    """Тест проверяет, что главная страница не загружает комментарии"""
+    with django_assert_num_queries(1):
+        client.get(reverse('news:home'))
+
+
+@pytest.mark.django_db
+def test_news_next_and_previous_pages(all_news, client):
+    """Тест проверяет переход по страницам новостей по курсору"""
+    url = reverse('news:home')
+    first_page = client.get(url).context['page_obj']
+    assert first_page.has_next()
+    assert not first_page.has_previous()
+    response = client.get(url, {'after': first_page.next_cursor()})
+    second_page = response.context['page_obj']
+    assert len(second_page) == 1
+    assert not set(first_page) & set(second_page)
+    assert second_page[0].date < first_page[-1].date
+    response = client.get(url, {'before': second_page.previous_cursor()})
+    assert list(response.context['object_list']) == list(first_page)
+
+
+@pytest.mark.django_db
+def test_news_invalid_cursor(client):
+    """Тест проверяет ответ на испорченный курсор страницы"""
+    response = client.get(reverse('news:home'), {'after': 'испорчен'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_deep_news_page_uses_index(all_news):
+    """Тест проверяет, что глубокая страница читается по индексу"""
+    paginator = KeysetPaginator(
+        News.objects.all(), ('-date', '-id'), settings.NEWS_COUNT_ON_HOME_PAGE
+    )
+    last = News.objects.order_by('date', 'id').first()
+    page = paginator.page(after=paginator.encode_cursor(last))
+    plan = page.queryset.explain()
+    assert 'news_date_id_idx' in plan
+
+
+@pytest.mark.django_db
+def test_comments_are_paginated(
+    client, detail_url, comment_list, news, settings
+):
+    """Тест проверяет подгрузку комментариев порциями"""
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 4
+    first_page = client.get(detail_url).context['comments']
+    assert len(first_page) == 4
+    assert first_page.has_next()
+    response = client.get(
+        reverse('news:comments', args=(news.id,)),
+        {'after': first_page.next_cursor()}
+    )
+    assert response.status_code == HTTPStatus.OK
+    second_page = response.context['comments']
+    assert [comment.created for comment in second_page] == sorted(
+        Comment.objects.values_list('created', flat=True)
+    )[4:8]
+
+
+@pytest.mark.django_db
+def test_comments_of_missing_news(client, news):
+    """Тест проверяет подгрузку комментариев несуществующей новости"""
+    missing = news.pk + 1
+    url = reverse('news:comments', args=(missing,))
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+    assert get_cache().get(news_cache_key(missing, 'comments:')) is None
+
+
+@pytest.mark.django_db
+def test_detail_queries_do_not_depend_on_thread_size(
+    client, detail_url, news, author, django_assert_num_queries
+):
+    """Тест проверяет, что первая страница комментариев стоит одинаково"""
+    Comment.objects.create(news=news, author=author, text='Текст')
+    with django_assert_num_queries(3):
+        client.get(detail_url)
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(settings.COMMENTS_COUNT_ON_DETAIL_PAGE * 3)
+    )
+    invalidate_news(news.pk)
+    with django_assert_num_queries(3):
+        response = client.get(detail_url)
+    comments = response.context['comments']
+    assert len(comments) == settings.COMMENTS_COUNT_ON_DETAIL_PAGE
+
+
+@pytest.mark.django_db
+def test_home_page_is_served_from_cache(
+    all_news, client, django_assert_num_queries
+):
+    """Тест проверяет, что повторный запрос главной не обращается к базе"""
+    url = reverse('news:home')
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.content == first.content
+
+
+@pytest.mark.django_db
+def test_home_page_cache_invalidated_on_change(
+    news, client, django_capture_on_commit_callbacks
+):
+    """Тест проверяет сброс кэша главной при изменении новости"""
+    url = reverse('news:home')
+    client.get(url)
+    news.title = 'Новый заголовок'
+    with django_capture_on_commit_callbacks(execute=True):
+        news.save()
+    assert news.title in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_cached_home_page_keeps_user_header(news, client, author_client):
+    """Тест проверяет, что закэшированная главная показывает пользователя"""
+    url = reverse('news:home')
+    client.get(url)
+    response = author_client.get(url)
+    assert 'Александр Пушкин' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_detail_is_served_from_object_cache(
+    client, detail_url, comment, settings, django_assert_num_queries
+):
+    """Тест проверяет, что новость и комментарии берутся из кэша"""
+    settings.NEWS_PAGE_CACHE = False
+    first = client.get(detail_url)
+    with django_assert_num_queries(1):
+        second = client.get(detail_url)
+    assert second.content == first.content
+
+
+@pytest.mark.django_db
+def test_comments_cache_keeps_only_shown_fields(
+    client, detail_url, comment, news
+):
+    """Тест проверяет, что в кэш не попадают данные пользователей"""
+    client.get(detail_url)
+    rows, _, _ = get_cache().get(news_cache_key(news.pk, 'comments:'))[0]
+    assert rows == [(
+        comment.pk, comment.text, comment.created,
+        comment.author_id, comment.author.username,
+    )]
+    assert all(type(value) in (int, str, datetime) for value in rows[0])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('alias', ('default', 'files'))
+def test_detail_cache_follows_comment_writes(
+    alias, settings, author_client, detail_url, comment,
+    django_capture_on_commit_callbacks
+):
+    """Тест проверяет сброс кэша новости при работе с комментариями"""
+    settings.NEWS_CACHE_ALIAS = alias
+    author_client.get(detail_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(detail_url, data={'text': 'Новый комментарий'})
+    content = author_client.get(detail_url).content.decode()
+    assert 'Новый комментарий' in content
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(
+            reverse('news:edit', args=(comment.pk,)),
+            data={'text': 'Исправленный текст'}
+        )
+    content = author_client.get(detail_url).content.decode()
+    assert 'Исправленный текст' in content
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(reverse('news:delete', args=(comment.pk,)))
+    response = author_client.get(detail_url)
+    assert 'Исправленный текст' not in response.content.decode()
+    assert len(response.context['comments']) == 1
+
+
+@pytest.mark.django_db
+def test_detail_not_modified(
+    client, detail_url, comment, settings, django_assert_num_queries
+):
+    """Тест проверяет ответ 304 на странице новости без рендеринга"""
+    settings.NEWS_PAGE_CACHE = False
+    response = client.get(detail_url)
+    with django_assert_num_queries(1):
+        not_modified = client.get(
+            detail_url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not not_modified.templates
+    not_modified = client.get(
+        detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('news:home', 'news:detail'))
+def test_anonymous_page_cache(name, news, client, django_assert_num_queries):
+    """Тест проверяет, что анонимная страница отдаётся из кэша без базы"""
+    url = reverse(name, args=(news.pk,) if name == 'news:detail' else None)
+    first = client.get(url)
+    assert 'public' in first['Cache-Control']
+    assert 'Cookie' in first['Vary']
+    with django_assert_num_queries(0):
+        second = client.get(url)
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert second.content == first.content
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_page_cache_skips_authenticated(author_client, detail_url):
+    """Тест проверяет, что страницы пользователей не кэшируются"""
+    response = author_client.get(detail_url)
+    assert 'public' not in response.get('Cache-Control', '')
+    assert response.context is not None
+    assert author_client.get(detail_url).context is not None
+
+
+@pytest.mark.django_db
+def test_page_cache_follows_comments(
+    client, author_client, detail_url, django_capture_on_commit_callbacks
+):
+    """Тест проверяет сброс кэша страницы после нового комментария"""
+    client.get(detail_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(detail_url, data={'text': 'Новый комментарий'})
+    assert 'Новый комментарий' in client.get(detail_url).content.decode()
+
+
+@pytest.mark.django_db
+def test_detail_validators_follow_comments(
+    client, detail_url, news, author, django_capture_on_commit_callbacks
+):
+    """Тест проверяет смену ETag после нового комментария"""
+    etag = client.get(detail_url)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(news=news, author=author, text='Текст')
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_validators_depend_on_user(client, author_client, detail_url):
+    """Тест проверяет, что ETag различается у разных пользователей"""
+    anonymous = client.get(detail_url)
+    response = author_client.get(
+        detail_url, HTTP_IF_NONE_MATCH=anonymous['ETag']
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert not response.has_header('Last-Modified')
+    assert 'Cookie' in response['Vary']
+
+
+@pytest.mark.django_db
+def test_detail_etag_changes_after_new_login(author, detail_url):
+    """Тест проверяет, что после нового входа форма получает новый токен"""
+    author.set_password('password')
+    author.save()
+    client = Client(enforce_csrf_checks=True)
+    login_url = reverse('users:login')
+
+    def login():
+        page = client.get(login_url)
+        client.post(login_url, {
+            'username': author.username,
+            'password': 'password',
+            'csrfmiddlewaretoken': page.context['csrf_token'],
+        })
+
+    login()
+    first = client.get(detail_url)
+    client.get(reverse('users:logout'))
+    login()
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert response.status_code == HTTPStatus.OK
+    response = client.post(detail_url, {
+        'text': 'Новый комментарий',
+        'csrfmiddlewaretoken': response.context['csrf_token'],
+    })
+    assert response.status_code == HTTPStatus.FOUND
+    assert Comment.objects.get().text == 'Новый комментарий'
+
+
+@pytest.mark.django_db
+def test_home_not_modified(all_news, client):
+    """Тест проверяет ответ 304 на главной странице"""
+    url = reverse('news:home')
+    etag = client.get(url)['ETag']
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(client):
+    """Тест проверяет поиск по префиксу и ранжирование по заголовку"""
+    in_text = News.objects.create(
+        title='Погода', text='Ожидаются сильные снегопады'
+    )
+    in_title = News.objects.create(title='Снегопады в Москве', text='Текст')
+    News.objects.create(title='Спорт', text='Футбол')
+    response = client.get(reverse('news:search'), {'q': 'снегопад'})
+    assert list(response.context['object_list']) == [in_title, in_text]
+
+
+@pytest.mark.django_db
+def test_search_api(client, news):
+    """Тест проверяет ответ API поиска"""
+    news.refresh_from_db()
+    response = client.get(reverse('news:search_api'), {'q': 'заголов'})
+    assert response.json() == {'results': [{
+        'id': news.id,
+        'title': news.title,
+        'date': news.date.isoformat(),
+        'url': reverse('news:detail', args=(news.id,)),
+    }]}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_news_detail(rf, news, comment, detail_url):
+    """Тест проверяет асинхронную страницу новости"""
+    request = rf.get(detail_url)
+    request.user = AnonymousUser()
+    response = async_to_sync(async_views.news_detail_view)(
+        request, pk=news.id
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert comment.text in response.content.decode()
+    request = rf.get(detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+    request.user = AnonymousUser()
+    response = async_to_sync(async_views.news_detail_view)(
+        request, pk=news.id
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_news_list(rf, news):
+    """Тест проверяет асинхронную главную страницу"""
+    request = rf.get(reverse('news:home'))
+    request.user = AnonymousUser()
+    response = async_to_sync(async_views.news_list)(request)
+    assert response.status_code == HTTPStatus.OK
+    assert news.title in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_news_most_read_order(all_news, client):
+    """Тест проверяет сортировку новостей по числу просмотров"""
+    News.objects.filter(
+        pk=News.objects.order_by('date').first().pk
+    ).update(views=100)
+    response = client.get(reverse('news:home'), {'order': 'popular'})
+    object_list = response.context['object_list']
+    all_views = [news.views for news in object_list]
+    assert all_views == sorted(all_views, reverse=True)
+    assert all_views[0] == 100
+
+
+@pytest.mark.django_db
+def test_most_read_order_follows_views(all_news, client, view_counter):
+    """Тест проверяет, что запись просмотров обновляет популярные новости"""
+    url = reverse('news:home')
+    first = client.get(url, {'order': 'popular'})
+    fresh = client.get(url)
+    last = News.objects.order_by('date').first()
+    view_counter.hit(last.pk)
+    view_counter.flush()
+    response = client.get(
+        url, {'order': 'popular'}, HTTP_IF_NONE_MATCH=first['ETag']
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['object_list'][0] == last
+    response = client.get(url, HTTP_IF_NONE_MATCH=fresh['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_most_discussed_news(client, news, author, all_news):
+    """Тест проверяет список самых обсуждаемых новостей"""
+    quiet = News.objects.exclude(pk=news.pk).first()
+    for index in range(2):
+        Comment.objects.create(news=news, author=author, text='Текст')
+    Comment.objects.create(news=quiet, author=author, text='Текст')
+    response = client.get(reverse('news:discussed'), {'period': 'week'})
+    ranks = response.context['object_list']
+    assert [(rank.news, rank.score) for rank in ranks] == [
+        (news, 2), (quiet, 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_admin_news_page_limits_comments(
+    admin_client, news, author, settings, django_assert_max_num_queries
+):
+    """Тест проверяет, что админка не выводит всю ветку комментариев"""
+    settings.NEWS_ADMIN_INLINE_COMMENTS = 5
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(30)
+    )
+    url = reverse('admin:news_news_change', args=(news.id,))
+    with django_assert_max_num_queries(10):
+        response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    formset = response.context['inline_admin_formsets'][0].formset
+    assert len(formset.forms) == 5
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'name',
+    ('admin:news_comment_changelist', 'admin:news_news_changelist'),
+)
+def test_admin_changelist_queries(
+    admin_client, comment_list, name, django_assert_max_num_queries
+):
+    """Тест проверяет число запросов на страницах списков в админке"""
+    with django_assert_max_num_queries(10):
+        response = admin_client.get(reverse(name))
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_detail_stream_renders_whole_thread(author_client, news, author):
+    """Тест проверяет потоковую страницу новости с длинным обсуждением"""
+    total = settings.COMMENTS_COUNT_ON_DETAIL_PAGE * 3
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(total)
+    )
+    url = reverse('news:detail_stream', args=(news.pk,))
+    response = author_client.get(url)
+    assert response.streaming
+    content = b''.join(response.streaming_content).decode()
+    assert content.count('<p class="mb-0">') == total
+    assert content.index(news.title) < content.index('Текст 0')
+    assert content.index(f'Текст {total - 1}') < content.index('<form')
+    assert 'csrfmiddlewaretoken' in content
+    assert 'csrftoken' in response.cookies
+
+
+@pytest.mark.django_db
+def test_detail_stream_accepts_comments(author_client, news):
+    """Тест проверяет отправку комментария с потоковой страницы"""
+    url = reverse('news:detail_stream', args=(news.pk,))
+    response = author_client.post(url, data={'text': 'Новый комментарий'})
+    assert response.status_code == HTTPStatus.FOUND
+    assert news.comment_set.get().text == 'Новый комментарий'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_detail_stream_under_asgi(news, author):
+    """Тест проверяет потоковую страницу новости под ASGI"""
+    total = settings.COMMENTS_COUNT_ON_DETAIL_PAGE * 3
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(total)
+    )
+
+    async def scenario():
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        await inbox.put({'type': 'http.request', 'body': b''})
+        await ASGIHandler()(
+            {'type': 'http', 'method': 'GET', 'query_string': b'',
+             'path': reverse('news:detail_stream', args=(news.pk,)),
+             'headers': [(b'host', b'testserver')]},
+            inbox.get, outbox.put
+        )
+        messages = []
+        while not outbox.empty():
+            messages.append(outbox.get_nowait())
+        return messages
+
+    start, *parts = asyncio.run(scenario())
+    assert start['status'] == HTTPStatus.OK
+    assert not parts[-1].get('more_body')
+    content = b''.join(part.get('body', b'') for part in parts).decode()
+    assert content.count('<p class="mb-0">') == total
@@ -1,10 +1,34 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
 from pytest_django.asserts import assertRedirects, assertFormError
 
+from news import async_views
+from news.cache import NEWS_VERSION_KEY, get_version, single_flight
+from news.export import export_lines
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.management.commands.benchmark import news_views
+from news.counters import ViewCounter
+from news.events import Broker, SQLitePollingBackend
+from news.models import Comment, DiscussionRank, News
+from news.profanity import WordMatcher, get_matcher
+from news.search import search_news
+from news.sse import sse_application
 
 
 @pytest.mark.django_db
@@ -104,3 +128,527 @@ def test_user_cant_edit_comment_of_another_user(
     assert comment.text == comment_text
     assert comment.news == news
     assert comment.author == author
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_create_and_delete(
+    author_client, detail_url, form_data, news
+):
+    """Тест проверяет обновление счётчика комментариев у новости"""
+    author_client.post(detail_url, data=form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    comment = Comment.objects.get()
+    author_client.post(reverse('news:delete', args=(comment.id,)))
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_orm_writes(news, author):
+    """Тест проверяет счётчик при записи комментариев в обход страниц"""
+    comment = Comment.objects.create(news=news, author=author, text='Текст')
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    comment.delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_admin(admin_client, news, author):
+    """Тест проверяет счётчик при работе с комментариями в админке"""
+    admin_client.post(reverse('admin:news_comment_add'), {
+        'news': news.pk, 'author': author.pk, 'text': 'Текст',
+    })
+    admin_client.post(reverse('admin:news_comment_add'), {
+        'news': news.pk, 'author': author.pk, 'text': 'Ещё текст',
+    })
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    first, second = Comment.objects.all()
+    admin_client.post(
+        reverse('admin:news_comment_delete', args=(first.pk,)),
+        {'post': 'yes'}
+    )
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    admin_client.post(reverse('admin:news_comment_changelist'), {
+        'action': 'delete_selected',
+        '_selected_action': [second.pk],
+        'post': 'yes',
+    })
+    news.refresh_from_db()
+    assert news.comment_count == 0
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_recount_comments_command(comment_list, news):
+    """Тест проверяет восстановление счётчика командой recount_comments"""
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count()
+
+
+def test_word_matcher_reports_spans():
+    """Тест проверяет позиции найденных слов, в том числе вложенных"""
+    matcher = WordMatcher(('он', 'негодяй', 'годяй', 'РЕДИСКА'))
+    text = 'Он негодяй и редиска'
+    assert sorted(matcher.find(text)) == [
+        (0, 2), (3, 10), (5, 10), (13, 20)
+    ]
+    assert matcher.search('Без ругательств') is None
+
+
+def test_matcher_reloads_words_file(tmp_path, settings):
+    """Тест проверяет загрузку слов из файла и пересборку при его смене"""
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# стоп-слова\nбалбес\n', encoding='utf-8')
+    settings.NEWS_BAD_WORDS_FILE = str(words_file)
+    matcher = get_matcher(BAD_WORDS)
+    assert matcher.search('Ну и балбес') == (5, 11)
+    assert get_matcher(BAD_WORDS) is matcher
+    words_file.write_text('бездельник\n', encoding='utf-8')
+    os.utime(words_file, ns=(0, 0))
+    matcher = get_matcher(BAD_WORDS)
+    assert matcher.search('Ну и балбес') is None
+    assert matcher.search('Ну и бездельник') is not None
+
+
+def test_matcher_keeps_words_if_file_missing(tmp_path, settings):
+    """Тест проверяет, что без файла слов остаётся прежний список"""
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('балбес\n', encoding='utf-8')
+    settings.NEWS_BAD_WORDS_FILE = str(words_file)
+    assert get_matcher(BAD_WORDS).search('Ну и балбес') is not None
+    words_file.unlink()
+    assert get_matcher(BAD_WORDS).search('Ну и балбес') is not None
+    settings.NEWS_BAD_WORDS_FILE = str(tmp_path / 'missing.txt')
+    matcher = get_matcher(BAD_WORDS)
+    assert matcher.search('Ну и балбес') is None
+    assert matcher.search(f'Ну и {BAD_WORDS[0]}') is not None
+
+
+@pytest.mark.django_db
+def test_benchmark_reports_all_scenarios():
+    """Тест проверяет, что замеры выполняются и не оставляют данных"""
+    out = StringIO()
+    call_command(
+        'benchmark', 'matcher', 'home', 'search',
+        news=20, words=20, repeat=2, stdout=out
+    )
+    for scenario in ('matcher', 'home', 'search rare', 'search common'):
+        assert f'{scenario}:' in out.getvalue()
+    assert not News.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_compares_wsgi_and_asgi():
+    """Тест проверяет замер WSGI и ASGI с асинхронными страницами"""
+    with news_views(use_async=True):
+        assert resolve('/').func is async_views.news_list
+    assert resolve('/').func is not async_views.news_list
+    out = StringIO()
+    call_command(
+        'benchmark', 'async', news=5, requests=6, concurrency=[2, 3],
+        stdout=out
+    )
+    assert out.getvalue().count('wsgi') == 2
+    assert 'async 3: wsgi' in out.getvalue()
+    assert not News.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'url, expected_queries',
+    (
+        # Сессия, пользователь, точка сохранения, UPDATE, INSERT,
+        # INSERT и UPDATE рейтинга, RELEASE.
+        (pytest.lazy_fixture('detail_url'), 8),
+        # Сессия, пользователь, комментарий, UPDATE.
+        (pytest.lazy_fixture('edit_url'), 4),
+        # Сессия, пользователь, комментарий, DELETE, UPDATE счётчика,
+        # UPDATE рейтинга.
+        (pytest.lazy_fixture('delete_url'), 6),
+    ),
+)
+def test_comment_write_queries(
+    author_client, comment, url, expected_queries, form_data,
+    django_assert_num_queries
+):
+    """Тест проверяет число запросов при записи комментария"""
+    with django_assert_num_queries(expected_queries):
+        author_client.post(url, data=form_data)
+
+
+@pytest.mark.django_db
+def test_cant_comment_missing_news(author_client, form_data):
+    """Тест проверяет комментарий к несуществующей новости"""
+    url = reverse('news:detail', args=(0,))
+    response = author_client.post(url, data=form_data)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert Comment.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_search_index_follows_changes(news):
+    """Тест проверяет обновление поискового индекса при правке новости"""
+    assert search_news('заголовок', 10) == [news]
+    news.title = 'Другое'
+    news.save()
+    assert search_news('заголовок', 10) == []
+    assert search_news('друг', 10) == [news]
+    news.delete()
+    assert search_news('друг', 10) == []
+
+
+@pytest.mark.django_db
+def test_export_streams_json_lines(admin_client, comment, news):
+    """Тест проверяет потоковую выгрузку новостей и комментариев"""
+    response = admin_client.get(reverse('news:export'))
+    assert response.streaming
+    rows = [
+        json.loads(line) for line in b''.join(response.streaming_content)
+        .decode().splitlines()
+    ]
+    assert [(row['model'], row['id']) for row in rows] == [
+        ('news', news.id), ('comment', comment.id)
+    ]
+
+
+@pytest.mark.django_db
+def test_export_since_and_gzip(admin_client, comment, news):
+    """Тест проверяет инкрементальную выгрузку со сжатием"""
+    tomorrow = (date.today() + timedelta(days=2)).isoformat()
+    response = admin_client.get(
+        reverse('news:export'), {'since': tomorrow, 'gzip': '1'}
+    )
+    assert response['Content-Type'] == 'application/gzip'
+    assert gzip.decompress(b''.join(response.streaming_content)) == b''
+
+
+@pytest.mark.django_db
+def test_export_requires_staff(author_client):
+    """Тест проверяет, что выгрузка недоступна обычному пользователю"""
+    response = author_client.get(reverse('news:export'))
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_export_news_command(tmp_path, comment):
+    """Тест проверяет выгрузку командой export_news"""
+    output = tmp_path / 'dump.jsonl.gz'
+    call_command('export_news', output=str(output), gzip=True)
+    lines = gzip.decompress(output.read_bytes()).decode().splitlines()
+    assert len(lines) == 2
+
+
+@pytest.mark.django_db
+def test_export_news_command_to_stdout(comment, news):
+    """Тест проверяет выгрузку в stdout с отбором по дате"""
+    out = StringIO()
+    call_command('export_news', since=comment.created.date(), stdout=out)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row['model'] for row in rows] == ['news', 'comment']
+    out = StringIO()
+    call_command(
+        'export_news', since=comment.created.date() + timedelta(days=1),
+        stdout=out
+    )
+    assert 'comment' not in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_export_since_uses_created_index(comment):
+    """Тест проверяет, что отбор комментариев по дате идёт по индексу"""
+    with CaptureQueriesContext(connection) as queries:
+        list(export_lines(comment.created.date()))
+    sql = next(
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "news_comment"' in query['sql']
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+    assert len(plan) == 1
+    assert plan[0].startswith('SEARCH news_comment USING INDEX')
+    assert plan[0].endswith('(created>?)')
+
+
+@pytest.mark.django_db
+def test_import_comments_command(tmp_path, news, author):
+    """Тест проверяет пакетную загрузку комментариев из CSV"""
+    source = tmp_path / 'comments.csv'
+    source.write_text(
+        'news_id,author,text,created\n'
+        f'{news.id},{author.username},Первый,2020-01-01T10:00:00\n'
+        f'{news.id},Незнакомец,Пропущенный,\n'
+        f'{news.id},{author.username},Второй,\n',
+        encoding='utf-8'
+    )
+    call_command(
+        'import_comments', str(source), chunk_size=2, stdout=StringIO()
+    )
+    assert list(
+        Comment.objects.values_list('text', flat=True)
+    ) == ['Первый', 'Второй']
+    assert Comment.objects.first().created.year == 2020
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    assert dict(DiscussionRank.objects.values_list('period', 'score')) == {
+        DiscussionRank.DAY: 1,
+        DiscussionRank.WEEK: 1,
+        DiscussionRank.MONTH: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_import_comments_skips_malformed_rows(tmp_path, news, author):
+    """Тест проверяет пропуск записей с ошибками в полях"""
+    source = tmp_path / 'comments.jsonl'
+    source.write_text(
+        json.dumps({'news_id': 'abc', 'author': author.username,
+                    'text': 'Без новости'}) + '\n'
+        + 'не json\n'
+        + json.dumps({'news_id': news.id, 'author': author.username}) + '\n'
+        + json.dumps({'news_id': news.id, 'author': author.username,
+                      'text': 'Плохая дата', 'created': 'вчера'}) + '\n'
+        + json.dumps({'news_id': news.id, 'author': author.username,
+                      'text': 'Хороший'}) + '\n',
+        encoding='utf-8'
+    )
+    checkpoint = tmp_path / 'checkpoint'
+    out = StringIO()
+    call_command(
+        'import_comments', str(source), chunk_size=2,
+        checkpoint=str(checkpoint), stdout=out
+    )
+    assert list(
+        Comment.objects.values_list('text', flat=True)
+    ) == ['Хороший']
+    assert 'пропущено: 4, из них с ошибками: 4' in out.getvalue()
+    assert checkpoint.read_text() == '5'
+
+
+@pytest.mark.django_db
+def test_import_comments_resumes_from_checkpoint(tmp_path, news, author):
+    """Тест проверяет продолжение загрузки после сбоя"""
+    source = tmp_path / 'comments.jsonl'
+    source.write_text(''.join(
+        json.dumps({'news_id': news.id, 'author': author.username,
+                    'text': f'Комментарий {index}'}) + '\n'
+        for index in range(5)
+    ), encoding='utf-8')
+    checkpoint = tmp_path / 'checkpoint'
+    checkpoint.write_text('3')
+    call_command(
+        'import_comments', str(source), checkpoint=str(checkpoint),
+        stdout=StringIO()
+    )
+    assert Comment.objects.count() == 2
+    assert checkpoint.read_text() == '5'
+
+
+def test_subscription_queue_is_bounded(settings):
+    """Тест проверяет, что медленный подписчик не копит события"""
+    settings.NEWS_EVENTS_QUEUE_SIZE = 2
+
+    async def scenario():
+        subscription = Broker().subscribe(1)
+        for index in range(5):
+            subscription.push(index)
+        events = [subscription.queue.get_nowait() for _ in range(2)]
+        return events, subscription.dropped
+
+    assert asyncio.run(scenario()) == ([3, 4], 3)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_events_stream_new_comments(news, author):
+    """Тест проверяет поток новых комментариев к новости"""
+
+    async def scenario():
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        stream = asyncio.ensure_future(sse_application(None)(
+            {'type': 'http', 'method': 'GET',
+             'path': f'/news/{news.id}/events/'},
+            inbox.get, outbox.put
+        ))
+        start = await asyncio.wait_for(outbox.get(), 5)
+        await sync_to_async(Comment.objects.create)(
+            news=news, author=author, text='Новый комментарий'
+        )
+        event = await asyncio.wait_for(outbox.get(), 5)
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(stream, 5)
+        return start, event
+
+    start, event = asyncio.run(scenario())
+    assert start['status'] == HTTPStatus.OK
+    assert 'Новый комментарий' in event['body'].decode()
+    assert event['body'].startswith(b'id: ')
+
+
+@pytest.mark.django_db
+def test_polling_backend_shares_events(news):
+    """Тест проверяет передачу событий через таблицу в базе"""
+    backend = SQLitePollingBackend()
+    last_id = backend._last_id()
+    backend.publish(news.id, {'id': 1, 'text': 'Текст'})
+    [(_, news_id, data)] = backend._fetch(last_id)
+    assert news_id == news.id
+    assert json.loads(data) == {'id': 1, 'text': 'Текст'}
+
+
+@pytest.mark.django_db
+def test_view_counter_coalesces_writes(
+    client, news, detail_url, settings, django_assert_num_queries
+):
+    """Тест проверяет, что просмотры записываются одним запросом"""
+    settings.NEWS_VIEWS_FLUSH_INTERVAL = 3600
+    other = News.objects.create(title='Другая', text='Текст')
+    counter = ViewCounter()
+    for _ in range(3):
+        counter.hit(news.id)
+    counter.hit(other.id)
+    with django_assert_num_queries(1):
+        counter.flush()
+    assert dict(News.objects.values_list('id', 'views')) == {
+        news.id: 3, other.id: 1
+    }
+
+
+@pytest.mark.django_db
+def test_detail_views_flushed_after_interval(
+    client, news, detail_url, settings
+):
+    """Тест проверяет запись просмотров по истечении интервала"""
+    settings.NEWS_VIEWS_FLUSH_INTERVAL = 0
+    client.get(detail_url)
+    news.refresh_from_db()
+    assert news.views == 1
+
+
+@pytest.mark.django_db
+def test_views_kept_if_database_locked(
+    client, news, detail_url, settings, monkeypatch, view_counter
+):
+    """Тест проверяет, что ошибка записи просмотров не ломает страницу"""
+    settings.NEWS_VIEWS_FLUSH_INTERVAL = 0
+
+    def locked(field, counts):
+        raise OperationalError('database is locked')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(News.objects, 'increment', locked)
+        assert client.get(detail_url).status_code == HTTPStatus.OK
+        assert client.get(detail_url).status_code == HTTPStatus.OK
+    view_counter.flush()
+    news.refresh_from_db()
+    assert news.views == 2
+
+
+@pytest.mark.django_db
+def test_discussion_rank_follows_comments(news, author):
+    """Тест проверяет обновление рейтинга обсуждаемых новостей"""
+    comment = Comment.objects.create(news=news, author=author, text='Текст')
+    Comment.objects.create(
+        news=news, author=author, text='Старый',
+        created=timezone.now() - timedelta(days=3)
+    )
+    assert dict(DiscussionRank.objects.values_list('period', 'score')) == {
+        DiscussionRank.DAY: 1,
+        DiscussionRank.WEEK: 2,
+        DiscussionRank.MONTH: 2,
+    }
+    comment.delete()
+    assert dict(DiscussionRank.objects.values_list('period', 'score')) == {
+        DiscussionRank.DAY: 0,
+        DiscussionRank.WEEK: 1,
+        DiscussionRank.MONTH: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_rebuild_rankings_command(news, comment):
+    """Тест проверяет, что пересчёт убирает устаревшие комментарии"""
+    Comment.objects.update(created=timezone.now() - timedelta(days=2))
+    call_command('rebuild_rankings', stdout=StringIO())
+    assert dict(DiscussionRank.objects.values_list('period', 'score')) == {
+        DiscussionRank.WEEK: 1,
+        DiscussionRank.MONTH: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_purge_old_comments(news, author):
+    """
+    Тест проверяет удаление старых комментариев порциями
+    с пересчётом счётчика, рейтинга и сбросом кэша новости
+    """
+    old = timezone.now() - timedelta(days=3)
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text='Старый', created=old)
+        for _ in range(5)
+    )
+    Comment.objects.create(news=news, author=author, text='Свежий')
+    News.objects.recount_comments()
+    DiscussionRank.objects.rebuild()
+    version = get_version(NEWS_VERSION_KEY.format(news.pk))
+    call_command(
+        'purge_old', 'comments', days=2, batch_size=2, sleep=0,
+        stdout=StringIO()
+    )
+    assert list(
+        Comment.objects.values_list('text', flat=True)
+    ) == ['Свежий']
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    assert dict(DiscussionRank.objects.values_list('period', 'score')) == {
+        DiscussionRank.DAY: 1,
+        DiscussionRank.WEEK: 1,
+        DiscussionRank.MONTH: 1,
+    }
+    assert get_version(NEWS_VERSION_KEY.format(news.pk)) != version
+
+
+@pytest.mark.django_db
+def test_purge_old_news(all_news, author):
+    """Тест проверяет удаление старых новостей вместе с комментариями"""
+    old_news = News.objects.filter(date__lt=date.today() - timedelta(days=5))
+    expected = News.objects.count() - old_news.count()
+    for news in old_news:
+        Comment.objects.create(news=news, author=author, text='Текст')
+    call_command(
+        'purge_old', 'news', days=5, batch_size=2, sleep=0,
+        stdout=StringIO()
+    )
+    assert News.objects.count() == expected
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.parametrize('stale', (False, True))
+def test_single_flight_recomputes_once(stale):
+    """Тест проверяет, что истёкшую запись пересчитывает один поток"""
+    calls = []
+    if stale:
+        single_flight('key', lambda: 'old', timeout=0)
+    barrier = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'new'
+
+    def request():
+        barrier.wait()
+        return single_flight('key', compute)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: request(), range(8)))
+    assert len(calls) == 1
+    assert 'new' in results
+    assert set(results) == ({'old', 'new'} if stale else {'new'})
+    assert single_flight('key', compute) == 'new'
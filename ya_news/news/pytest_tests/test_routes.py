@@ -11,6 +11,9 @@ from pytest_django.asserts import assertRedirects
     (
         ('news:home', None),
         ('news:detail', pytest.lazy_fixture('news_id')),
+        ('news:detail_stream', pytest.lazy_fixture('news_id')),
+        ('news:search', None),
+        ('news:discussed', None),
         ('users:login', None),
         ('users:logout', None),
         ('users:signup', None),
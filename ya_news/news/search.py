@@ -0,0 +1,64 @@
+import re
+
+from django.db import connection
+
+from .models import News
+
+SEARCH_TABLE = 'news_search'
+TOKEN = re.compile(r'\w+')
+
+SEARCH_SQL = f'''
+    SELECT news_news.*, bm25({SEARCH_TABLE}, 10.0, 1.0) AS rank
+    FROM {SEARCH_TABLE}
+    JOIN news_news ON news_news.id = {SEARCH_TABLE}.rowid
+    WHERE {SEARCH_TABLE} MATCH %s
+    ORDER BY rank
+    LIMIT %s
+'''
+
+
+def build_query(text):
+    """
+    Запрос FTS5 из пользовательского текста.
+
+    Каждое слово ищется как префикс, все слова обязательны.
+    Кавычки не дают пользователю использовать синтаксис FTS5.
+    """
+    return ' '.join(f'"{token}"*' for token in TOKEN.findall(text.lower()))
+
+
+def search_news(text, limit):
+    """Новости по запросу, самые релевантные первыми."""
+    query = build_query(text)
+    if not query:
+        return []
+    return list(News.objects.raw(SEARCH_SQL, (query, limit)))
+
+
+def index_news(news):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', (news.pk,)
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, text) '
+            'VALUES (%s, %s, %s)',
+            (news.pk, news.title, news.text)
+        )
+
+
+def unindex_news(news_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', (news_id,)
+        )
+
+
+def rebuild_index():
+    """Заново строит индекс по всем новостям."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, text) '
+            'SELECT id, title, text FROM news_news'
+        )
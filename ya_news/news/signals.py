@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_news
+from .events import comment_event, get_backend
+from .models import Comment, DiscussionRank, News
+from .search import index_news, unindex_news
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def news_changed(sender, instance, **kwargs):
+    news_id = instance.pk
+    transaction.on_commit(lambda: invalidate_news(news_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_counted(sender, instance, created, **kwargs):
+    """Новый комментарий к несуществующей новости не сохраняется."""
+    if created and not News.objects.filter(pk=instance.news_id).update(
+        comment_count=F('comment_count') + 1
+    ):
+        raise News.DoesNotExist('Новость не найдена.')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncounted(sender, instance, **kwargs):
+    News.objects.filter(
+        pk=instance.news_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    news_id = instance.news_id
+    transaction.on_commit(lambda: invalidate_news(news_id))
+
+
+@receiver(post_save, sender=News)
+def news_saved(sender, instance, **kwargs):
+    index_news(instance)
+
+
+@receiver(post_delete, sender=News)
+def news_deleted(sender, instance, **kwargs):
+    unindex_news(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        event = comment_event(instance)
+        news_id = instance.news_id
+        transaction.on_commit(
+            lambda: get_backend().publish(news_id, event)
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_ranked(sender, instance, created, **kwargs):
+    if created:
+        DiscussionRank.objects.record(instance.news_id, instance.created, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_unranked(sender, instance, **kwargs):
+    DiscussionRank.objects.record(instance.news_id, instance.created, -1)
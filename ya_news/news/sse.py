@@ -0,0 +1,88 @@
+"""
+Поток новых комментариев новости в формате Server-Sent Events.
+
+Django 3.2 не умеет отдавать асинхронный поток из представления,
+поэтому поток обслуживается ASGI-приложением, которое стоит перед
+Django и пропускает к нему все остальные запросы.
+"""
+import asyncio
+import json
+import re
+
+from django.conf import settings
+
+from .async_views import run_orm
+from .events import broker, get_backend
+from .models import News
+
+EVENTS_PATH = re.compile(r'^/news/(?P<pk>\d+)/events/$')
+
+
+def sse_application(django_application):
+    async def application(scope, receive, send):
+        match = None
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = EVENTS_PATH.match(scope['path'])
+        if match is None:
+            return await django_application(scope, receive, send)
+        return await stream_comments(int(match['pk']), receive, send)
+    return application
+
+
+async def stream_comments(news_id, receive, send):
+    """Отдаёт новые комментарии новости, пока клиент не отключится."""
+    if not await run_orm(News.objects.filter(pk=news_id).exists):
+        await send({
+            'type': 'http.response.start',
+            'status': 404,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    await get_backend().listen()
+    subscription = broker.subscribe(news_id)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    received = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        while not disconnected.done():
+            if received is None or received.done():
+                received = asyncio.ensure_future(subscription.get())
+            await asyncio.wait(
+                (received, disconnected),
+                timeout=settings.NEWS_EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if received.done():
+                body = format_event(received.result())
+            else:
+                body = b': ping\n\n'
+            if not disconnected.done():
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+    finally:
+        subscription.close()
+        disconnected.cancel()
+        if received is not None:
+            received.cancel()
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def format_event(data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f'id: {data["id"]}\nevent: comment\ndata: {payload}\n\n'.encode()
@@ -1,16 +1,38 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import async_views, views
 
 app_name = 'news'
 
+if settings.NEWS_ASYNC_VIEWS:
+    home_view = async_views.news_list
+    detail_view = async_views.news_detail_view
+else:
+    home_view = views.NewsList.as_view()
+    detail_view = views.NewsDetailView.as_view()
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', home_view, name='home'),
+    path('news/<int:pk>/', detail_view, name='detail'),
+    path(
+        'news/<int:pk>/stream/',
+        views.NewsDetailStream.as_view(),
+        name='detail_stream'
+    ),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
+    path('discussed/', views.NewsDiscussed.as_view(), name='discussed'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('api/search/', views.news_search_api, name='search_api'),
+    path('export/', views.NewsExport.as_view(), name='export'),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
 ]
@@ -1,27 +1,131 @@
+from collections import namedtuple
+from datetime import date
+from functools import partial
+from itertools import islice
+
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.utils.safestring import mark_safe
 from django.views import generic
 
+from .cache import (
+    NEWS_VERSION_KEY, cached_home, cached_news, home_version_keys
+)
+from .conditional import conditional_get, detail_validators, home_validators
+from .counters import view_counter
+from .export import export_lines, gzip_stream
 from .forms import CommentForm
-from .models import Comment, News
+from .models import Comment, DiscussionRank, News
+from .page_cache import anonymous_page
+from .pagination import KeysetPaginator
+from .search import search_news
 
 
 class NewsList(generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    ordering = ('-date', '-id')
+    orderings = {
+        'popular': ('-views', '-id'),
+    }
+    paginate_by = settings.NEWS_COUNT_ON_HOME_PAGE
 
-    def get_queryset(self):
+    def get(self, request, *args, **kwargs):
+        version_keys = home_version_keys(request)
+        return anonymous_page(request, version_keys, lambda: (
+            conditional_get(
+                request,
+                home_validators(request),
+                partial(super(NewsList, self).get, request, *args, **kwargs)
+            )
+        ))
+
+    def get_ordering(self):
+        """Свежие новости или, с ?order=popular, самые читаемые."""
+        return self.orderings.get(
+            self.request.GET.get('order'), self.ordering
+        )
+
+    def paginate_queryset(self, queryset, page_size):
         """
-        Выводим только несколько последних новостей.
+        Новости выводятся страницами по курсору, а не по номеру.
 
-        Их количество определяется в настройках проекта.
+        Размер страницы определяется в настройках проекта.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        paginator = KeysetPaginator(queryset, self.get_ordering(), page_size)
+        page = paginator.page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        # Запрос к базе выполнится, только если список не найден в кэше.
+        is_paginated = SimpleLazyObject(page.has_other_pages)
+        return paginator, page, page, is_paginated
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        order = self.request.GET.get('order')
+        context['order'] = order if order in self.orderings else ''
+        context['cache_timeout'] = settings.NEWS_CACHE_TIMEOUT
+        context['cache_alias'] = settings.NEWS_CACHE_ALIAS
+        context['news_list'] = cached_home(
+            self.request,
+            lambda: render_to_string('news/includes/news_list.html', context)
+        )
+        return context
+
+
+def get_news(pk):
+    """Новость из кэша или из базы."""
+    return cached_news(pk, 'object', partial(get_object_or_404, News, pk=pk))
+
+
+class CommentRow(namedtuple(
+    'CommentRow', ('id', 'text', 'created', 'author_id', 'author')
+)):
+    """Комментарий для страницы новости: author — имя автора."""
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+
+def comment_rows(window):
+    """Строки страницы комментариев в виде CommentRow для кэша."""
+    rows, *flags = window
+    return ([CommentRow(*row) for row in rows], *flags)
+
+
+def comments_page(request, news_id):
+    """
+    Страница комментариев к новости, начиная с курсора after.
+
+    В кэш попадают только поля, которые выводит страница, а не
+    объекты комментариев и пользователей целиком.
+    """
+    after = request.GET.get('after')
+    paginator = KeysetPaginator(
+        Comment.objects.filter(news_id=news_id).values_list(
+            'id', 'text', 'created', 'author_id', 'author__username'
+        ),
+        ('created', 'id'),
+        settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+    )
+    page = paginator.page(after=after)
+    page.window = cached_news(
+        news_id, f'comments:{after or ""}', lambda: comment_rows(page.window)
+    )
+    return page
 
 
 class NewsDetail(generic.DetailView):
@@ -29,19 +133,28 @@ class NewsDetail(generic.DetailView):
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_news(self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['comments'] = comments_page(self.request, self.object.pk)
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
 
+class NewsComments(generic.TemplateView):
+    """Следующая порция комментариев к новости для подгрузки."""
+    template_name = 'news/includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        news = get_news(self.kwargs['pk'])
+        context['news_id'] = news.pk
+        context['comments'] = comments_page(self.request, news.pk)
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
         generic.detail.SingleObjectMixin,
@@ -52,27 +165,108 @@ class NewsComment(
     template_name = 'news/detail.html'
 
     def post(self, request, *args, **kwargs):
-        self.object = self.get_object()
+        self.object = None
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
+        """
+        Новость не загружается: счётчик обновляется по id.
+
+        Если новости нет, сохранение комментария отменяется.
+        """
         comment = form.save(commit=False)
-        comment.news = self.object
+        comment.news_id = self.kwargs['pk']
         comment.author = self.request.user
-        comment.save()
+        try:
+            comment.save()
+        except News.DoesNotExist:
+            raise Http404('Новость не найдена.')
         return super().form_valid(form)
 
+    def form_invalid(self, form):
+        self.object = self.get_object()
+        return super().form_invalid(form)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = comments_page(self.request, self.object.pk)
+        return context
+
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.kwargs['pk']}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
 
     def get(self, request, *args, **kwargs):
+        view_counter.hit(kwargs['pk'])
         view = NewsDetail.as_view()
+        version_keys = (NEWS_VERSION_KEY.format(kwargs['pk']),)
+        return anonymous_page(request, version_keys, lambda: (
+            conditional_get(
+                request,
+                detail_validators(request, kwargs['pk']),
+                partial(view, request, *args, **kwargs)
+            )
+        ))
+
+    def post(self, request, *args, **kwargs):
+        view = NewsComment.as_view()
         return view(request, *args, **kwargs)
 
+
+class NewsDetailStream(generic.View):
+    """
+    Страница новости, которая отдаётся по частям.
+
+    Шапка и текст новости уходят сразу, а комментарии рендерятся
+    порциями по мере чтения из базы, поэтому ни память, ни время
+    до первого байта не зависят от длины обсуждения.
+    """
+    template_name = 'news/detail_stream.html'
+    comments_template_name = 'news/includes/comments.html'
+    marker = '<!-- comments -->'
+    chunk_size = 100
+
+    def get(self, request, *args, **kwargs):
+        view_counter.hit(kwargs['pk'])
+        news = get_news(kwargs['pk'])
+        comments = Comment.objects.filter(news_id=news.pk)
+        context = {
+            'news': news,
+            'object': news,
+            'comments': comments.exists(),
+            'comments_marker': mark_safe(self.marker),
+        }
+        if request.user.is_authenticated:
+            context['form'] = CommentForm()
+        # Форма с CSRF-токеном рендерится до отправки ответа,
+        # чтобы middleware успел поставить cookie.
+        head, tail = render_to_string(
+            self.template_name, context, request
+        ).split(self.marker, 1)
+        return StreamingHttpResponse(
+            self.stream(request, news, comments, head, tail)
+        )
+
+    def stream(self, request, news, comments, head, tail):
+        yield head
+        rows = comments.select_related('author').order_by(
+            'created', 'id'
+        ).iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            yield render_to_string(
+                self.comments_template_name,
+                {'comments': chunk, 'news_id': news.pk},
+                request,
+            )
+        yield tail
+
     def post(self, request, *args, **kwargs):
         view = NewsComment.as_view()
         return view(request, *args, **kwargs)
@@ -83,9 +277,8 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
@@ -102,3 +295,82 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+class NewsSearch(generic.ListView):
+    """Поиск по новостям."""
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        return search_news(
+            self.request.GET.get('q', ''), settings.NEWS_SEARCH_RESULTS
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+def news_search_api(request):
+    """Результаты поиска по новостям в JSON."""
+    results = search_news(
+        request.GET.get('q', ''), settings.NEWS_SEARCH_RESULTS
+    )
+    return JsonResponse({'results': [
+        {
+            'id': news.pk,
+            'title': news.title,
+            'date': news.date,
+            'url': reverse('news:detail', args=(news.pk,)),
+        }
+        for news in results
+    ]})
+
+
+class NewsExport(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Потоковая выгрузка новостей и комментариев в JSON Lines."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        since = request.GET.get('since')
+        try:
+            since = date.fromisoformat(since) if since else None
+        except ValueError:
+            return HttpResponseBadRequest('Некорректная дата.')
+        chunks = export_lines(since)
+        filename = 'news.jsonl'
+        content_type = 'application/x-ndjson'
+        if request.GET.get('gzip'):
+            chunks = gzip_stream(chunks)
+            filename += '.gz'
+            content_type = 'application/gzip'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
+
+class NewsDiscussed(generic.ListView):
+    """Самые обсуждаемые новости за сутки, неделю или месяц."""
+    template_name = 'news/discussed.html'
+
+    def get_period(self):
+        period = self.request.GET.get('period')
+        if period in DiscussionRank.SPANS:
+            return period
+        return DiscussionRank.DAY
+
+    def get_queryset(self):
+        return DiscussionRank.objects.filter(
+            period=self.get_period(), score__gt=0
+        ).order_by('-score', 'news').select_related(
+            'news'
+        )[:settings.NEWS_DISCUSSED_COUNT]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['period'] = self.get_period()
+        context['periods'] = DiscussionRank.PERIODS
+        return context
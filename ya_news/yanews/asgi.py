@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from news.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+os.environ.setdefault('NEWS_ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from news.sse import sse_application  # noqa: E402
+
+application = sse_application(django_application)
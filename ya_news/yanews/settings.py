@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -58,6 +60,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'files': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'yanews-cache'),
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +92,44 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+
+NEWS_SEARCH_RESULTS = 20
+
+NEWS_DISCUSSED_COUNT = 10
+
+# Сколько последних комментариев показывать на странице новости в админке.
+NEWS_ADMIN_INLINE_COMMENTS = 20
+
+# Как часто записывать накопленные просмотры новостей, в секундах.
+NEWS_VIEWS_FLUSH_INTERVAL = 10
+
+NEWS_CACHE_TIMEOUT = 60 * 15
+# Кэш страниц и объектов новостей: 'default' в памяти процесса или
+# 'files' на диске, общий для всех процессов сервера.
+NEWS_CACHE_ALIAS = os.getenv('NEWS_CACHE_ALIAS', 'default')
+# Пересчёт истёкшей записи: сколько ещё отдавать старое значение,
+# сколько ждать чужого пересчёта и сколько держать блокировку.
+NEWS_CACHE_STALE_TIMEOUT = 60
+NEWS_CACHE_LOCK_WAIT = 2
+NEWS_CACHE_LOCK_TIMEOUT = 10
+# Кэш целых страниц для запросов без сессии и срок хранения
+# их копий в браузерах и прокси, в секундах.
+NEWS_PAGE_CACHE = True
+NEWS_PAGE_CACHE_MAX_AGE = 60
+
+# Файл с дополнительными запрещёнными словами, по одному в строке.
+NEWS_BAD_WORDS_FILE = None
+
+# Асинхронные страницы новостей; включаются в yanews/asgi.py.
+NEWS_ASYNC_VIEWS = os.getenv('NEWS_ASYNC_VIEWS') == '1'
+# Размер общего пула потоков для ORM в асинхронных страницах.
+NEWS_ASYNC_ORM_WORKERS = 16
+
+# Поток новых комментариев: бэкенд рассылки и ограничения соединения.
+NEWS_EVENTS_BACKEND = 'news.events.LocalBackend'
+NEWS_EVENTS_QUEUE_SIZE = 50
+NEWS_EVENTS_HEARTBEAT = 15
+NEWS_EVENTS_POLL_INTERVAL = 1
+NEWS_EVENTS_RETENTION = 60 * 10
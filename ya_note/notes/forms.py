@@ -1,9 +1,8 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
 from .models import Note
+from .slugs import allocate_slug
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
 
@@ -16,14 +15,29 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+        """
+        Обрабатывает случай, если slug не уникален.
+
+        Пустой slug остаётся пустым: свободный адрес выберет
+        Note.save. Для занятого адреса предлагается свободный.
+        """
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
+            return slug
+        others = Note.objects.exclude(id=self.instance.pk)
+        free_slug = allocate_slug(
+            others, slug, Note._meta.get_field('slug').max_length
+        )
+        if free_slug != slug:
+            raise ValidationError([
+                slug + WARNING, f'Например, {free_slug}'
+            ])
         return slug
+
+
+class NoteImportForm(forms.Form):
+    """Форма загрузки заметок из файла."""
+    file = forms.FileField(
+        label='Файл',
+        help_text='JSON Lines (.jsonl) или zip-архив с файлами Markdown'
+    )
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.transfer import FORMATS, export_lines, export_zip
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает заметки пользователя в JSON Lines или в zip-архив '
+        'с файлами Markdown.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        export = export_zip if options['format'] == 'zip' else export_lines
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(export(author, options['chunk_size']))
+            return
+        if options['format'] == 'zip':
+            # Архив — двоичные данные, в текстовый поток их не записать.
+            buffer = getattr(self.stdout._out, 'buffer', None)
+            if buffer is None:
+                raise CommandError('Архив zip пишется только в --output.')
+            buffer.writelines(export(author, options['chunk_size']))
+            buffer.flush()
+            return
+        # Каждая порция — целые строки, поэтому её можно декодировать
+        # отдельно и писать в self.stdout, который подменяет call_command.
+        for chunk in export(author, options['chunk_size']):
+            self.stdout.write(chunk.decode(), ending='')
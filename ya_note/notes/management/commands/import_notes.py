@@ -0,0 +1,44 @@
+import zipfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.transfer import FORMATS, file_format, import_file
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает заметки пользователя из JSON Lines или из zip-архива '
+        'с файлами Markdown. Поля записи: title, text, необязательные '
+        'slug и created.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', type=Path)
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        path = Path(options['path'])
+        rows_format = options['format'] or file_format(path.name)
+        try:
+            with path.open('rb') as source:
+                imported = import_file(
+                    author, source, rows_format, options['chunk_size']
+                )
+        except (ValueError, zipfile.BadZipFile) as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        self.stdout.write(f'Загружено заметок: {imported}')
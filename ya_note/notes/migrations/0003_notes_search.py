@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_id_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE notes_search USING fts5("
+                "title, text, owner, "
+                "tokenize='unicode61 remove_diacritics 2')",
+                'INSERT INTO notes_search (rowid, title, text, owner) '
+                "SELECT id, title, text, 'a' || author_id FROM notes_note",
+            ],
+            reverse_sql=['DROP TABLE notes_search'],
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_notes_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Создана'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменена'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалена'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='slug',
+            field=models.SlugField(blank=True, help_text='Укажите адрес для страницы заметки. Используйте только латиницу, цифры, дефисы и знаки подчёркивания', max_length=100, null=True, unique=True, verbose_name='Адрес для страницы с заметкой'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'updated', 'id'], name='note_author_updated_id_idx'),
+        ),
+    ]
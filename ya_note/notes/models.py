@@ -1,7 +1,17 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 
-from pytils.translit import slugify
+from .slugs import allocate_slug, title_slug
+
+SLUG_ATTEMPTS = 10
+
+
+class NoteManager(models.Manager):
+    """Заметки без удалённых."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class Note(models.Model):
@@ -20,6 +30,7 @@ class Note(models.Model):
         max_length=100,
         unique=True,
         blank=True,
+        null=True,
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
     )
@@ -27,12 +38,63 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(
+        'Создана', default=timezone.now, editable=False
+    )
+    updated = models.DateTimeField('Изменена', auto_now=True)
+    deleted_at = models.DateTimeField(
+        'Удалена', null=True, blank=True, editable=False
+    )
+
+    objects = NoteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+            models.Index(
+                fields=('author', 'updated', 'id'),
+                name='note_author_updated_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Без адреса заметка получает свободный адрес из заголовка.
+
+        Если адрес успел занять параллельный запрос, он выбирается
+        заново, но не больше SLUG_ATTEMPTS раз.
+        """
+        if self.slug or self.deleted_at:
+            return super().save(*args, **kwargs)
+        max_slug_length = self._meta.get_field('slug').max_length
+        base = title_slug(self.title, max_slug_length)
+        others = Note.objects.exclude(pk=self.pk)
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            self.slug = allocate_slug(others, base, max_slug_length)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if (
+                    attempt == SLUG_ATTEMPTS
+                    or not others.filter(slug=self.slug).exists()
+                ):
+                    self.slug = ''
+                    raise
+
+    def delete(self, using=None, keep_parents=False):
+        """
+        Заметка остаётся в базе с отметкой об удалении.
+
+        По отметке клиенты синхронизации узнают об удалении из ленты
+        изменений. Адрес освобождается для новых заметок.
+        """
+        self.deleted_at = timezone.now()
+        self.slug = None
+        self.save(using=using, update_fields=('deleted_at', 'slug', 'updated'))
+        return 1, {self._meta.label: 1}
@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+INVALID_CURSOR = 'Некорректный курсор страницы.'
+
+
+class KeysetPage:
+    """
+    Страница записей по возрастанию id, начиная после курсора after.
+
+    Курсор — id последней записи предыдущей страницы, поэтому
+    глубокие страницы стоят столько же, сколько первая.
+    """
+
+    def __init__(self, queryset, per_page, after=None):
+        if after is not None:
+            try:
+                after = int(after)
+            except ValueError:
+                raise Http404(INVALID_CURSOR)
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(queryset.order_by('pk')[:per_page + 1])
+        self.object_list = rows[:per_page]
+        self.after = after
+        self.next_cursor = None
+        if len(rows) > per_page:
+            self.next_cursor = self.object_list[-1].pk
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.after is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_change_cursor(note):
+    """Непрозрачный курсор ленты изменений после заметки note."""
+    raw = json.dumps(
+        [note.updated.isoformat(), note.pk], separators=(',', ':')
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def changes_after(queryset, cursor, per_page):
+    """
+    Заметки, изменённые после курсора, по возрастанию (updated, id).
+
+    Возвращает записи страницы, курсор для следующего запроса
+    и признак, что изменения ещё остались. Если изменений нет,
+    клиент получает свой же курсор.
+    """
+    if cursor:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            updated, note_id = json.loads(raw)
+            updated = parse_datetime(updated)
+            if updated is None or not isinstance(note_id, int):
+                raise ValueError(cursor)
+        except (ValueError, TypeError, binascii.Error):
+            raise Http404(INVALID_CURSOR)
+        queryset = queryset.filter(
+            Q(updated__gt=updated) | Q(updated=updated, pk__gt=note_id)
+        )
+    rows = list(queryset.order_by('updated', 'pk')[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if rows:
+        cursor = encode_change_cursor(rows[-1])
+    return rows, cursor or '', has_more
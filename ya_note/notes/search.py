@@ -0,0 +1,80 @@
+import re
+
+from django.db import connection
+
+from .models import Note
+
+SEARCH_TABLE = 'notes_search'
+TOKEN = re.compile(r'\w+')
+
+SEARCH_SQL = f'''
+    SELECT notes_note.*, bm25({SEARCH_TABLE}, 10.0, 1.0, 0.0) AS rank
+    FROM {SEARCH_TABLE}
+    JOIN notes_note ON notes_note.id = {SEARCH_TABLE}.rowid
+    WHERE {SEARCH_TABLE} MATCH %s
+    ORDER BY rank
+    LIMIT %s
+'''
+
+
+def owner_token(author_id):
+    """Слово автора в индексе: по нему FTS5 отбирает заметки автора."""
+    return f'a{author_id}'
+
+
+def build_query(author_id, text):
+    """
+    Запрос FTS5 по заметкам одного автора.
+
+    Каждое слово ищется как префикс в заголовке и тексте, все слова
+    обязательны. Кавычки не дают пользователю использовать
+    синтаксис FTS5.
+    """
+    tokens = ' '.join(
+        f'"{token}"*' for token in TOKEN.findall(text.lower())
+    )
+    if not tokens:
+        return ''
+    owner = owner_token(author_id)
+    return f'owner : "{owner}" AND {{title text}} : ({tokens})'
+
+
+def search_notes(author, text, limit):
+    """Заметки автора по запросу, самые релевантные первыми."""
+    query = build_query(author.pk, text)
+    if not query:
+        return []
+    return list(Note.objects.raw(SEARCH_SQL, (query, limit)))
+
+
+def index_note(note):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', (note.pk,)
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, text, owner) '
+            'VALUES (%s, %s, %s, %s)',
+            (note.pk, note.title, note.text, owner_token(note.author_id))
+        )
+
+
+def unindex_note(note_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', (note_id,)
+        )
+
+
+def index_slugs(slugs):
+    """Добавляет в индекс заметки с адресами из slugs одним запросом."""
+    if not slugs:
+        return
+    placeholders = ', '.join(['%s'] * len(slugs))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, text, owner) '
+            "SELECT id, title, text, 'a' || author_id FROM notes_note "
+            f'WHERE slug IN ({placeholders})',
+            list(slugs)
+        )
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Note
+from .search import index_note, unindex_note
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, **kwargs):
+    if instance.deleted_at is None:
+        index_note(instance)
+    else:
+        unindex_note(instance.pk)
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    unindex_note(instance.pk)
@@ -0,0 +1,69 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from pytils.translit import slugify
+
+# Запас под суффикс вида «-12345» при обрезке длинных адресов.
+MAX_SUFFIX_LENGTH = 8
+# Адрес для заголовков, из которых не получается ни одного символа.
+DEFAULT_SLUG = 'note'
+
+
+def title_slug(title, max_length):
+    """Адрес заметки из её заголовка или DEFAULT_SLUG."""
+    return slugify(title)[:max_length] or DEFAULT_SLUG
+
+
+def variants_filter(base, max_length):
+    """
+    Условие на адреса, которые может выбрать free_slug из base.
+
+    Короткий адрес дополняется суффиксом целиком, поэтому варианты
+    — это сам base и base-N. У длинного перед суффиксом обрезается
+    конец, и варианты совпадают только в первых
+    max_length - MAX_SUFFIX_LENGTH символах.
+    """
+    prefix = base[:max_length - MAX_SUFFIX_LENGTH]
+    if prefix == base:
+        return Q(slug=base) | Q(slug__startswith=f'{base}-')
+    return Q(slug__startswith=prefix)
+
+
+def taken_slugs(queryset, bases, max_length):
+    """
+    Занятые адреса, которые могут совпасть с вариантами bases.
+
+    Хватает одного запроса на весь набор адресов.
+    """
+    bases = set(bases)
+    if not bases:
+        return set()
+    return set(queryset.filter(reduce(or_, (
+        variants_filter(base, max_length) for base in bases
+    ))).values_list('slug', flat=True))
+
+
+def free_slug(base, taken, max_length):
+    """Первый адрес из base, base-2, base-3..., которого нет в taken."""
+    if base not in taken:
+        return base
+    number = 2
+    while True:
+        suffix = f'-{number}'
+        candidate = base[:max_length - len(suffix)] + suffix
+        if candidate not in taken:
+            return candidate
+        number += 1
+
+
+def allocate_slug(queryset, base, max_length):
+    """
+    Первый свободный адрес из base, base-2, base-3...
+
+    Занятые варианты читаются одним запросом по общему префиксу,
+    поэтому число запросов не зависит от количества совпадений.
+    """
+    return free_slug(
+        base, taken_slugs(queryset, (base,), max_length), max_length
+    )
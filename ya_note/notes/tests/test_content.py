@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 
 from notes.models import Note
 from notes.forms import NoteForm
@@ -53,3 +56,56 @@ class TestHomePage(TestCase):
                 response = user_status.get(url)
                 object_list = response.context.get('object_list')
                 self.assertEqual((self.note in object_list), note_in_list)
+
+
+class TestNotesList(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Александр Пушкин')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.author)
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text='Текст',
+                slug=f'note-{index}',
+                author=cls.author
+            )
+            for index in range(settings.NOTES_COUNT_ON_PAGE + 5)
+        )
+        cls.url = reverse('notes:list')
+
+    def test_notes_list_is_paginated(self):
+        """Тест проверяет постраничный вывод заметок по курсору"""
+        response = self.auth_client.get(self.url)
+        first_page = list(response.context['object_list'])
+        self.assertEqual(len(first_page), settings.NOTES_COUNT_ON_PAGE)
+        page = response.context['page_obj']
+        self.assertTrue(page.has_next())
+        response = self.auth_client.get(
+            self.url, {'after': page.next_cursor}
+        )
+        second_page = list(response.context['object_list'])
+        self.assertEqual(
+            first_page + second_page, list(Note.objects.order_by('id'))
+        )
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_notes_list_invalid_cursor(self):
+        """Тест проверяет ответ 404 на некорректный курсор"""
+        response = self.auth_client.get(self.url, {'after': 'abc'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_notes_list_cost_does_not_depend_on_text(self):
+        """Тест проверяет, что список не читает тексты заметок"""
+        with CaptureQueriesContext(connection) as short_texts:
+            self.auth_client.get(self.url)
+        Note.objects.update(text='Текст' * 100000)
+        with CaptureQueriesContext(connection) as long_texts:
+            response = self.auth_client.get(self.url)
+        self.assertEqual(len(long_texts), len(short_texts))
+        for query in long_texts.captured_queries:
+            self.assertNotIn('"notes_note"."text"', query['sql'])
+        for note in response.context['object_list']:
+            self.assertNotIn('text', note.__dict__)
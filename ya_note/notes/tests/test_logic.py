@@ -1,12 +1,34 @@
+import io
+import json
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from http import HTTPStatus
+from pathlib import Path
+from unittest import mock
 
 from pytils.translit import slugify
-from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
+from notes import models
 from notes.models import Note
 from notes.forms import WARNING
+from notes.search import (
+    SEARCH_SQL, SEARCH_TABLE, build_query, search_notes
+)
+from notes.slugs import taken_slugs
+from notes.transfer import import_file, import_notes
 
 User = get_user_model()
 
@@ -83,6 +105,49 @@ class TestNoteCreation(TestCase):
         expected_slug = slugify(self.form_data['title'])
         self.assertEqual(new_note.slug, expected_slug)
 
+    def test_empty_slug_gets_suffix(self):
+        """Тест проверяет суффикс у адреса из уже занятого заголовка"""
+        url = reverse(self.notes_add)
+        self.form_data.pop('slug')
+        for _ in range(3):
+            self.author_client.post(url, data=self.form_data)
+        expected_slug = slugify(self.form_data['title'])
+        self.assertEqual(
+            list(Note.objects.filter(
+                title=self.form_data['title']
+            ).values_list('slug', flat=True)),
+            [expected_slug, f'{expected_slug}-2', f'{expected_slug}-3']
+        )
+
+    def test_title_without_slug_characters(self):
+        """
+        Тест проверяет адрес по умолчанию для заголовка без букв
+        и что соседние адреса не считаются его вариантами
+        """
+        Note.objects.create(
+            title='Блокнот', text='Текст', slug='notebook', author=self.author
+        )
+        notes = [
+            Note.objects.create(title='!!!', text='Текст', author=self.author)
+            for _ in range(2)
+        ]
+        self.assertEqual([note.slug for note in notes], ['note', 'note-2'])
+        taken = taken_slugs(Note.objects.all(), ('note',), 100)
+        self.assertTrue({'note', 'note-2'} <= taken)
+        self.assertNotIn('notebook', taken)
+
+    def test_slug_allocation_retries_on_conflict(self):
+        """Тест проверяет повторный выбор адреса, если его заняли"""
+        with mock.patch.object(
+            models, 'allocate_slug',
+            side_effect=[self.note.slug, 'note-slug-2']
+        ) as allocate:
+            note = Note.objects.create(
+                title='Заголовок', text='Текст', author=self.author
+            )
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(note.slug, 'note-slug-2')
+
 
 class TestNoteEditDeleteAndSlug(TestCase):
 
@@ -144,3 +209,391 @@ class TestNoteEditDeleteAndSlug(TestCase):
         response = self.auth_reader.post(url)
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertEqual(Note.objects.count(), all_notes)
+
+
+class TestNoteSearch(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Александр Пушкин')
+        cls.reader = User.objects.create(username='Евгений Онегин')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.in_text = Note.objects.create(
+            title='Покупки', text='Купить молоко', author=cls.author
+        )
+        cls.in_title = Note.objects.create(
+            title='Молоко', text='Без лактозы', author=cls.author
+        )
+        cls.other = Note.objects.create(
+            title='Молоко', text='Чужая заметка', author=cls.reader
+        )
+
+    def test_search_scoped_to_user_and_ranked(self):
+        """Тест проверяет поиск только по своим заметкам по префиксу"""
+        response = self.author_client.get(
+            reverse('notes:search'), {'q': 'МОЛОК'}
+        )
+        self.assertEqual(
+            list(response.context['object_list']),
+            [self.in_title, self.in_text]
+        )
+
+    def test_search_index_follows_changes(self):
+        """Тест проверяет обновление индекса при правке и удалении"""
+        self.author_client.post(
+            reverse('notes:edit', args=(self.in_text.slug,)),
+            {'title': 'Покупки', 'text': 'Купить хлеб',
+             'slug': self.in_text.slug}
+        )
+        self.assertEqual(
+            search_notes(self.author, 'хлеб', 10), [self.in_text]
+        )
+        self.assertEqual(
+            search_notes(self.author, 'молоко', 10), [self.in_title]
+        )
+        self.author_client.post(
+            reverse('notes:delete', args=(self.in_title.slug,))
+        )
+        self.assertEqual(search_notes(self.author, 'молоко', 10), [])
+
+    def test_search_uses_fts_index(self):
+        """
+        Тест проверяет, что поиск идёт по индексу FTS5,
+        а заметки читаются по первичному ключу без обхода таблицы
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'EXPLAIN QUERY PLAN {SEARCH_SQL}',
+                (build_query(self.author.pk, 'молоко'), 10)
+            )
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(any(
+            step.startswith(f'SCAN {SEARCH_TABLE} VIRTUAL TABLE INDEX')
+            and ':M' in step
+            for step in plan
+        ), plan)
+        self.assertIn(
+            'SEARCH notes_note USING INTEGER PRIMARY KEY (rowid=?)', plan
+        )
+        self.assertNotIn('SCAN notes_note', plan)
+
+
+class TestNoteChanges(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Александр Пушкин')
+        cls.reader = User.objects.create(username='Евгений Онегин')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        for index in range(3):
+            Note.objects.create(
+                title=f'Заметка {index}', text='Текст', author=cls.author
+            )
+        Note.objects.create(title='Чужая', text='Текст', author=cls.reader)
+        cls.url = reverse('notes:changes')
+
+    def sync(self, cursor=''):
+        return self.author_client.get(self.url, {'cursor': cursor}).json()
+
+    def test_soft_delete_keeps_tombstone(self):
+        """Тест проверяет, что удалённая заметка остаётся отметкой"""
+        note = Note.objects.first()
+        self.author_client.post(reverse('notes:delete', args=(note.slug,)))
+        self.assertFalse(Note.objects.filter(pk=note.pk).exists())
+        tombstone = Note.all_objects.get(pk=note.pk)
+        self.assertIsNotNone(tombstone.deleted_at)
+        self.assertIsNone(tombstone.slug)
+        self.assertEqual(
+            Note.objects.create(
+                title=note.title, text='Текст', author=self.author
+            ).slug,
+            note.slug
+        )
+
+    @override_settings(NOTES_CHANGES_PAGE=2)
+    def test_changes_feed(self):
+        """Тест проверяет ленту изменений заметок автора по курсору"""
+        first = self.sync()
+        self.assertTrue(first['has_more'])
+        second = self.sync(first['cursor'])
+        self.assertFalse(second['has_more'])
+        notes = Note.objects.filter(author=self.author)
+        self.assertEqual(
+            [note['id'] for note in first['changes'] + second['changes']],
+            [note.pk for note in notes]
+        )
+        note = notes.first()
+        note.text = 'Новый текст'
+        note.save()
+        changed = self.sync(second['cursor'])
+        self.assertEqual(
+            [(item['id'], item['text']) for item in changed['changes']],
+            [(note.pk, 'Новый текст')]
+        )
+        note.delete()
+        deleted = self.sync(changed['cursor'])
+        self.assertEqual(
+            deleted['changes'][0], {
+                'id': note.pk,
+                'deleted': True,
+                'updated': deleted['changes'][0]['updated'],
+            }
+        )
+
+    def test_unchanged_sync_is_cheap(self):
+        """Тест проверяет, что пустая синхронизация стоит одного запроса"""
+        cursor = self.sync()['cursor']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(self.url, {'cursor': cursor})
+        note_queries = [
+            query for query in queries.captured_queries
+            if 'notes_note' in query['sql']
+        ]
+        self.assertEqual(len(note_queries), 1)
+        self.assertEqual(
+            response.json(), {'changes': [], 'cursor': cursor,
+                              'has_more': False}
+        )
+        self.assertLess(len(response.content), 300)
+
+    def test_invalid_changes_cursor(self):
+        """Тест проверяет ответ 404 на некорректный курсор"""
+        response = self.author_client.get(self.url, {'cursor': 'abc'})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class TestNoteTransfer(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Александр Пушкин')
+        cls.reader = User.objects.create(username='Евгений Онегин')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        for index in range(3):
+            Note.objects.create(
+                title=f'Заметка {index}',
+                text=f'Текст {index}',
+                author=cls.author
+            )
+        Note.objects.create(title='Чужая', text='Текст', author=cls.reader)
+        cls.url = reverse('notes:export')
+
+    def test_export_streams_json_lines(self):
+        """Тест проверяет потоковую выгрузку своих заметок в JSON Lines"""
+        response = self.author_client.get(self.url)
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Заметка 0', 'Заметка 1', 'Заметка 2']
+        )
+
+    def test_export_streams_markdown_zip(self):
+        """Тест проверяет выгрузку заметок в zip-архив с Markdown"""
+        response = self.author_client.get(self.url, {'format': 'zip'})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertEqual(
+            archive.namelist(),
+            [f'{note.slug}.md' for note in Note.objects.filter(
+                author=self.author
+            )]
+        )
+        self.assertEqual(
+            archive.read('zametka-0.md').decode(),
+            '# Заметка 0\n\nТекст 0\n'
+        )
+
+    def test_import_round_trip(self):
+        """Тест проверяет загрузку выгрузки другим пользователем"""
+        response = self.author_client.get(self.url, {'format': 'zip'})
+        upload = SimpleUploadedFile(
+            'notes.zip', b''.join(response.streaming_content)
+        )
+        response = self.reader_client.post(
+            reverse('notes:import'), {'file': upload}
+        )
+        self.assertRedirects(response, reverse('notes:success'))
+        imported = Note.objects.filter(author=self.reader).exclude(
+            title='Чужая'
+        )
+        self.assertEqual(
+            list(imported.values_list('slug', 'title', 'text')),
+            [
+                (f'zametka-{index}-2', f'Заметка {index}', f'Текст {index}')
+                for index in range(3)
+            ]
+        )
+        self.assertEqual(
+            search_notes(self.reader, 'заметка 1', 10),
+            [imported.get(slug='zametka-1-2')]
+        )
+
+    def test_import_checks_slugs_once_per_chunk(self):
+        """Тест проверяет один запрос адресов на порцию заметок"""
+        rows = [
+            {'title': 'Заметка 0', 'text': 'Текст'} for _ in range(10)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            imported = import_notes(self.reader, rows, chunk_size=5)
+        self.assertEqual(imported, 10)
+        slug_queries = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "notes_note"."slug"')
+        ]
+        self.assertEqual(len(slug_queries), 2)
+        self.assertEqual(
+            sorted(Note.objects.filter(
+                author=self.reader, title='Заметка 0'
+            ).values_list('slug', flat=True)),
+            sorted(f'zametka-0-{number}' for number in range(2, 12))
+        )
+
+    def test_import_rejects_broken_file(self):
+        """Тест проверяет, что испорченный файл не загружается"""
+        notes_count = Note.objects.count()
+        upload = SimpleUploadedFile(
+            'notes.jsonl', b'{"title": "A", "text": "B"}\nnot json\n'
+        )
+        response = self.author_client.post(
+            reverse('notes:import'), {'file': upload}
+        )
+        self.assertFormError(
+            response, 'form', 'file', 'Не удалось прочитать файл.'
+        )
+        self.assertEqual(Note.objects.count(), notes_count)
+
+    def test_import_restores_created_only(self):
+        """
+        Тест проверяет, что загрузка сохраняет время создания,
+        а новые заметки попадают в ленту изменений
+        """
+        # JSON хранит время с точностью до миллисекунд.
+        now = timezone.now().replace(microsecond=0)
+        Note.objects.filter(author=self.author).update(
+            created=now - timedelta(days=30), updated=now - timedelta(days=3)
+        )
+        changes_url = reverse('notes:changes')
+        cursor = self.reader_client.get(changes_url).json()['cursor']
+        response = self.author_client.get(self.url)
+        upload = SimpleUploadedFile(
+            'notes.jsonl', b''.join(response.streaming_content)
+        )
+        self.reader_client.post(reverse('notes:import'), {'file': upload})
+        imported = Note.objects.filter(author=self.reader).exclude(
+            title='Чужая'
+        )
+        self.assertEqual(
+            list(imported.values_list('title', 'created')),
+            list(Note.objects.filter(
+                author=self.author
+            ).values_list('title', 'created'))
+        )
+        self.assertTrue(all(note.updated >= now for note in imported))
+        changes = self.reader_client.get(
+            changes_url, {'cursor': cursor}
+        ).json()['changes']
+        self.assertEqual(
+            [change['id'] for change in changes],
+            [note.pk for note in imported]
+        )
+
+    def test_import_rejects_non_string_fields(self):
+        """Тест проверяет, что поля заметки должны быть строками"""
+        notes_count = Note.objects.count()
+        for line in (
+            b'{"title": "A", "text": null}\n',
+            b'{"title": 1, "text": "B"}\n',
+        ):
+            upload = SimpleUploadedFile('notes.jsonl', line)
+            response = self.author_client.post(
+                reverse('notes:import'), {'file': upload}
+            )
+            self.assertFormError(
+                response, 'form', 'file', 'Не удалось прочитать файл.'
+            )
+        self.assertEqual(Note.objects.count(), notes_count)
+
+    def test_import_retries_only_slug_conflicts(self):
+        """Тест проверяет, что другие ошибки целостности не повторяются"""
+        with mock.patch(
+            'notes.transfer.save_notes', side_effect=IntegrityError
+        ) as save:
+            with self.assertRaises(IntegrityError):
+                import_notes(self.reader, [{'title': 'A', 'text': 'B'}])
+        self.assertEqual(save.call_count, 1)
+
+    def test_import_checks_whole_file_first(self):
+        """Тест проверяет, что ошибка в конце файла не оставляет порций"""
+        notes_count = Note.objects.count()
+        source = io.BytesIO(
+            b'{"title": "A", "text": "B"}\n' * 3
+            + b'{"title": "C", "created": "never"}\n'
+        )
+        with self.assertRaises(ValueError):
+            import_file(self.reader, source, 'jsonl', chunk_size=1)
+        self.assertEqual(Note.objects.count(), notes_count)
+
+    def test_export_command_to_stdout(self):
+        """Тест проверяет выгрузку командой в перехваченный stdout"""
+        out = io.StringIO()
+        call_command('export_notes', self.author.username, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Заметка 0', 'Заметка 1', 'Заметка 2']
+        )
+        with self.assertRaises(CommandError):
+            call_command(
+                'export_notes', self.author.username, format='zip',
+                stdout=io.StringIO()
+            )
+
+    def test_export_and_import_commands(self):
+        """Тест проверяет команды выгрузки и загрузки заметок"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'notes.jsonl'
+            call_command(
+                'export_notes', self.author.username, output=str(path)
+            )
+            call_command(
+                'import_notes', self.reader.username, str(path),
+                stdout=io.StringIO()
+            )
+        self.assertEqual(
+            Note.objects.filter(author=self.reader).count(), 4
+        )
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+
+    def test_parallel_notes_get_unique_slugs(self):
+        """Тест проверяет уникальные адреса при параллельном создании"""
+        author = User.objects.create(username='Александр Пушкин')
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def create_note(_):
+            barrier.wait()
+            try:
+                return Note.objects.create(
+                    title='Заголовок', text='Текст', author=author
+                ).slug
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            slugs = list(executor.map(create_note, range(workers)))
+        expected = ['zagolovok'] + [
+            f'zagolovok-{number}' for number in range(2, workers + 1)
+        ]
+        self.assertEqual(sorted(slugs), sorted(expected))
@@ -29,6 +29,10 @@ class TestRoutes(TestCase):
 
         cls.URL_NOTES_HOME = reverse('notes:home')
         cls.URL_NOTES_LIST = reverse('notes:list')
+        cls.URL_NOTES_SEARCH = reverse('notes:search')
+        cls.URL_NOTES_CHANGES = reverse('notes:changes')
+        cls.URL_NOTES_EXPORT = reverse('notes:export')
+        cls.URL_NOTES_IMPORT = reverse('notes:import')
         cls.URL_NOTES_ADD = reverse('notes:add')
         cls.URL_NOTES_SUCCESS = reverse('notes:success')
         cls.URL_USERS_LOGIN = reverse('users:login')
@@ -55,6 +59,10 @@ class TestRoutes(TestCase):
         """Тест проверяет доступность страниц авторизованным пользователям"""
         urls = (
             self.URL_NOTES_LIST,
+            self.URL_NOTES_SEARCH,
+            self.URL_NOTES_CHANGES,
+            self.URL_NOTES_EXPORT,
+            self.URL_NOTES_IMPORT,
             self.URL_NOTES_ADD,
             self.URL_NOTES_SUCCESS,
         )
@@ -94,7 +102,11 @@ class TestRoutes(TestCase):
             self.URL_NOTES_DELETE,
             self.URL_NOTES_ADD,
             self.URL_NOTES_SUCCESS,
-            self.URL_NOTES_LIST
+            self.URL_NOTES_LIST,
+            self.URL_NOTES_SEARCH,
+            self.URL_NOTES_CHANGES,
+            self.URL_NOTES_EXPORT,
+            self.URL_NOTES_IMPORT,
         )
         for url in urls:
             with self.subTest(url=url):
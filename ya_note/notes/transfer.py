@@ -0,0 +1,213 @@
+"""
+Выгрузка и загрузка заметок пользователя.
+
+Форматы: JSON Lines, по заметке в строке, и zip-архив с файлом
+Markdown на каждую заметку.
+"""
+import io
+import json
+import zipfile
+from itertools import islice
+from pathlib import PurePath
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import SLUG_ATTEMPTS, Note
+from .search import index_slugs
+from .slugs import free_slug, taken_slugs, title_slug
+
+EXPORT_FIELDS = ('slug', 'title', 'text', 'created', 'updated')
+TEXT_FIELDS = ('title', 'text', 'slug')
+FORMATS = ('jsonl', 'zip')
+DEFAULT_TITLE = Note._meta.get_field('title').default
+
+
+def file_format(name):
+    """Формат файла по расширению: zip или JSON Lines."""
+    return 'zip' if PurePath(name).suffix == '.zip' else 'jsonl'
+
+
+def export_notes(author):
+    return Note.objects.filter(author=author).order_by('pk')
+
+
+def export_lines(author, chunk_size=2000):
+    """
+    Заметки автора построчно в формате JSON Lines.
+
+    Строки читаются из базы порциями через iterator(), поэтому
+    память не зависит от количества заметок.
+    """
+    rows = export_notes(author).values(*EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield json.dumps(
+            row, cls=DjangoJSONEncoder, ensure_ascii=False
+        ).encode() + b'\n'
+
+
+class StreamBuffer(io.RawIOBase):
+    """
+    Файл только для записи, из которого забираются записанные байты.
+
+    Он не поддерживает seek, поэтому zipfile пишет архив
+    последовательно, и архив целиком в памяти не держится.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def to_markdown(title, text):
+    return f'# {title}\n\n{text}\n'
+
+
+def from_markdown(content):
+    """Заголовок и текст заметки из файла Markdown."""
+    first_line, _, text = content.partition('\n')
+    if first_line.startswith('# '):
+        return first_line[2:].strip(), text.strip('\n')
+    return '', content
+
+
+def export_zip(author, chunk_size=2000):
+    """Заметки автора в zip-архиве по файлу Markdown на заметку."""
+    buffer = StreamBuffer()
+    notes = export_notes(author).values_list('slug', 'title', 'text')
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for slug, title, text in notes.iterator(chunk_size=chunk_size):
+            archive.writestr(f'{slug}.md', to_markdown(title, text))
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def read_rows(source, file_format):
+    """Записи заметок из бинарного файла source."""
+    if file_format == 'zip':
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                path = PurePath(info.filename)
+                if info.is_dir() or path.suffix != '.md':
+                    continue
+                title, text = from_markdown(
+                    archive.read(info).decode('utf-8')
+                )
+                yield {'title': title, 'text': text, 'slug': path.stem}
+        return
+    for line in source:
+        if line.strip():
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError('Запись заметки должна быть объектом.')
+            for field in TEXT_FIELDS:
+                if field in row and not isinstance(row[field], str):
+                    raise ValueError(f'Поле {field} должно быть строкой.')
+            row['created'] = parse_timestamp(row.get('created'))
+            yield row
+
+
+def parse_timestamp(value):
+    """Время из выгрузки или None, если его нет."""
+    if value is None:
+        return None
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        raise ValueError(f'Некорректное время: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def import_file(author, source, file_format, chunk_size=500):
+    """
+    Загружает заметки из бинарного файла source.
+
+    Порции сохраняются в отдельных транзакциях, поэтому файл
+    сначала прочитывается целиком: ошибка в его конце не должна
+    оставить в базе первые порции.
+    """
+    for _ in read_rows(source, file_format):
+        pass
+    source.seek(0)
+    return import_notes(author, read_rows(source, file_format), chunk_size)
+
+
+def import_notes(author, rows, chunk_size=500):
+    """
+    Загружает заметки порциями и возвращает их количество.
+
+    Адреса всей порции проверяются одним запросом, занятые
+    получают суффикс. Порция сохраняется через bulk_create
+    в своей транзакции; если адрес успел занять параллельный
+    запрос, порция повторяется с новыми адресами. Другие ошибки
+    целостности не повторяются.
+    """
+    max_length = Note._meta.get_field('slug').max_length
+    rows = iter(rows)
+    imported = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return imported
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            notes = build_notes(author, chunk, max_length)
+            try:
+                with transaction.atomic():
+                    imported += save_notes(notes)
+                break
+            except IntegrityError:
+                if (
+                    attempt == SLUG_ATTEMPTS
+                    or not Note.objects.filter(
+                        slug__in=[note.slug for note in notes]
+                    ).exists()
+                ):
+                    raise
+
+
+def build_notes(author, chunk, max_length):
+    """
+    Заметки порции со свободными адресами.
+
+    Время создания берётся из файла, а updated ставит auto_now:
+    по нему лента изменений отдаёт загруженные заметки клиентам.
+    """
+    bases = [
+        title_slug(row.get('slug') or row.get('title') or '', max_length)
+        for row in chunk
+    ]
+    taken = taken_slugs(Note.objects.all(), bases, max_length)
+    notes = []
+    for row, base in zip(chunk, bases):
+        slug = free_slug(base, taken, max_length)
+        taken.add(slug)
+        note = Note(
+            title=row.get('title') or DEFAULT_TITLE,
+            text=row.get('text', ''),
+            slug=slug,
+            author=author,
+        )
+        if row.get('created'):
+            note.created = row['created']
+        notes.append(note)
+    return notes
+
+
+def save_notes(notes):
+    Note.objects.bulk_create(notes)
+    index_slugs([note.slug for note in notes])
+    return len(notes)
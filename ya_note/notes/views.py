@@ -1,9 +1,16 @@
+import zipfile
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.views import generic
 
-from .forms import NoteForm
+from .forms import NoteForm, NoteImportForm
 from .models import Note
+from .pagination import KeysetPage, changes_after
+from .search import search_notes
+from .transfer import export_lines, export_zip, file_format, import_file
 
 
 class Home(generic.TemplateView):
@@ -52,8 +59,105 @@ class NoteDelete(NoteBase, generic.DeleteView):
 class NotesList(NoteBase, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    paginate_by = settings.NOTES_COUNT_ON_PAGE
+
+    def get_queryset(self):
+        """Из базы читаются только поля, которые выводит список."""
+        return super().get_queryset().only('id', 'slug', 'title')
+
+    def paginate_queryset(self, queryset, page_size):
+        """Заметки выводятся страницами по курсору after."""
+        page = KeysetPage(queryset, page_size, self.request.GET.get('after'))
+        return None, page, page.object_list, page.has_other_pages()
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        return search_notes(
+            self.request.user,
+            self.request.GET.get('q', ''),
+            settings.NOTES_SEARCH_RESULTS,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteChanges(LoginRequiredMixin, generic.View):
+    """
+    Лента изменений заметок для клиентов синхронизации в JSON.
+
+    Отдаёт заметки, изменённые после курсора cursor, включая
+    удалённые, для которых передаётся только отметка deleted.
+    """
+
+    def get(self, request, *args, **kwargs):
+        notes, cursor, has_more = changes_after(
+            Note.all_objects.filter(author=request.user),
+            request.GET.get('cursor'),
+            settings.NOTES_CHANGES_PAGE,
+        )
+        return JsonResponse({
+            'changes': [self.serialize(note) for note in notes],
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+    @staticmethod
+    def serialize(note):
+        if note.deleted_at is not None:
+            return {'id': note.pk, 'deleted': True, 'updated': note.updated}
+        return {
+            'id': note.pk,
+            'slug': note.slug,
+            'title': note.title,
+            'text': note.text,
+            'created': note.created,
+            'updated': note.updated,
+        }
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """Потоковая выгрузка заметок в JSON Lines или zip с Markdown."""
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'zip':
+            chunks = export_zip(request.user)
+            filename = 'notes.zip'
+            content_type = 'application/zip'
+        else:
+            chunks = export_lines(request.user)
+            filename = 'notes.jsonl'
+            content_type = 'application/x-ndjson'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
+
+class NoteImport(LoginRequiredMixin, generic.FormView):
+    """Загрузка заметок из файла выгрузки."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+    success_url = reverse_lazy('notes:success')
+
+    def form_valid(self, form):
+        """Испорченный файл не загружается, остальные — порциями."""
+        uploaded = form.cleaned_data['file']
+        try:
+            import_file(
+                self.request.user, uploaded, file_format(uploaded.name)
+            )
+        except (ValueError, zipfile.BadZipFile):
+            form.add_error('file', 'Не удалось прочитать файл.')
+            return self.form_invalid(form)
+        return super().form_valid(form)
@@ -56,6 +56,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Тестовая база в файле: в памяти SQLite не ждёт блокировку,
+        # а сразу отказывает параллельным записям из потоков.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -87,3 +90,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_PAGE = 20
+
+NOTES_SEARCH_RESULTS = 20
+
+NOTES_CHANGES_PAGE = 100